@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+# numba is optional: when present, kernels are compiled once and cached on
+# disk; when absent, the plain-Python functions run unchanged. Kernels must
+# stay free of game objects and attribute lookups so they remain valid
+# numba input either way.
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        return wrap
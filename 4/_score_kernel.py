@@ -0,0 +1,67 @@
+from __future__ import annotations
+from typing import List, Tuple
+
+from ._jit import njit
+
+
+@njit(cache=True, nogil=True)
+def score_hand(cost: List[float], dmg: List[float], blk: List[float],
+               draw: List[float], energy_gain: List[float], status: List[float],
+               low_health: bool, need_block: bool, vulnerable: bool,
+               hand_full: bool, energy: float,
+               turn: int) -> Tuple[List[float], List[float], List[float]]:
+    """Compute base, situational and efficiency scores for a packed hand.
+
+    All inputs are the struct-of-arrays columns built by
+    AIStrategy._hand_to_soa plus the hand-invariant condition scalars.
+    """
+    n = len(cost)
+    base = [0.0] * n
+    situational = [0.0] * n
+    efficiency = [0.0] * n
+
+    # Bug 20: Turn scaling is too aggressive
+    turn_modifier = 1.0 + (turn / 10.0)
+
+    for i in range(n):
+        # Base score from per-kind effect totals
+        # Bug 6: Not accounting for AoE damage differently
+        # Bug 8: All statuses valued equally
+        b = (dmg[i] * 2.0 + blk[i] * 1.5 + draw[i] * 3.0 +
+             energy_gain[i] * 4.0 + status[i] * 2.5)
+        if cost[i] > 0:
+            b = b / cost[i]
+        else:
+            b *= 2  # Free cards are valuable
+        base[i] = b
+
+        # Situational score
+        s = 0.0
+        if low_health:
+            if blk[i] > 0:
+                s += 20.0
+            # Bug 10: Also prioritizes damage when low health
+            if dmg[i] > 0:
+                s += 15.0
+        if need_block and blk[i] > 0:
+            # Bug 11: Not checking if block amount is sufficient
+            s += min(30.0, blk[i])
+        if vulnerable:
+            # Bug 12: Double counting damage bonus
+            s += dmg[i] * 0.5 * 2
+        if energy - cost[i] < 1:
+            # Bug 13: Penalizes using all energy
+            s -= 5.0
+        if hand_full:
+            s += 10.0  # Play something to avoid overdraw
+        situational[i] = s
+
+        # Energy efficiency
+        if cost[i] == 0:
+            efficiency[i] = 100.0  # Free cards are maximally efficient
+        else:
+            # Bug 18: Not all effects should be valued equally
+            total_value = dmg[i] + blk[i] + draw[i] + energy_gain[i] + status[i]
+            efficiency[i] = min(100.0, total_value / cost[i] * turn_modifier)
+
+    return base, situational, efficiency
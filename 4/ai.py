@@ -1,14 +1,21 @@
 from __future__ import annotations
-from typing import List, Dict, Tuple, Optional, Set, Any
+from typing import List, Dict, Tuple, Optional, Set, Any, Callable, Deque
 from dataclasses import dataclass
-from decimal import Decimal
+from types import SimpleNamespace
 import math
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 from functools import lru_cache
-from .types import GameState, Card, StatusType, Effect, EffectTiming
+from .types import (GameState, Card, StatusType, Effect, EffectTiming,
+                    tag_bit, VULNERABLE_IDX)
 from .config import Config
+from ._score_kernel import score_hand
 
-@dataclass(frozen=True)
+_POWER_BIT = tag_bit("power")
+_FINISHER_BIT = tag_bit("finisher")
+
+# Throwaway per-turn scratch data: slots keep construction cheap and the
+# strategy modifiers are free to adjust scores in place
+@dataclass(slots=True)
 class CardEvaluation:
     card_index: int
     card: Card
@@ -16,260 +23,333 @@ class CardEvaluation:
     situational_score: float
     combo_score: float
     efficiency: float
-    
-    @property
-    def total_score(self) -> float:
+    total_score: float = 0.0
+
+    def finalize(self) -> CardEvaluation:
         # Bug 1: Weights don't sum to 1.0
-        return (self.base_score * 0.4 + 
-                self.situational_score * 0.3 + 
-                self.combo_score * 0.2 +
-                self.efficiency * 0.2)
+        self.total_score = (self.base_score * 0.4 +
+                            self.situational_score * 0.3 +
+                            self.combo_score * 0.2 +
+                            self.efficiency * 0.2)
+        return self
 
 class AIStrategy:
     """Complex AI strategy for card selection"""
+
+    # Bound on the transposition tables; entries are evicted LRU-style
+    _TT_MAX = 4096
+
     def __init__(self, config: Config):
         self.config = config
         self.priorities = config.ai_priorities
-        self._cache: Dict[int, Any] = {}
-        self._combo_tracker = defaultdict(int)
-        self._turn_history: List[List[str]] = []
+        # Priorities are static after config load: split them by condition
+        # once so the per-turn path never re-parses the dicts.
+        self._always_priorities = [
+            (p["tag"], p["multiplier"])
+            for p in self.priorities if p["condition"] == "always"
+        ]
+        self._low_health_priorities = [
+            (p["tag"], p["multiplier"], p["threshold"])
+            for p in self.priorities if p["condition"] == "low_health"
+        ]
+        self._apply_priorities = self._compile_priorities()
+        # Transposition tables: canonical state signature -> decision.
+        # Battles revisit near-identical (hand, energy, enemy) states, so a
+        # hit skips the whole scoring pass.
+        self._tt: OrderedDict[Tuple, Tuple[float, Optional[str]]] = OrderedDict()
+        self._lethal_tt: OrderedDict[Tuple, Optional[Tuple[str, ...]]] = OrderedDict()
+        # Keyed by tags_mask: the int hash is constant time and needs no
+        # frozenset allocation per lookup
+        self._combo_tracker: Dict[int, int] = defaultdict(int)
+        # Ring buffer capped like PlayerState.turn_history
+        self._turn_history: Deque[List[str]] = deque(maxlen=20)
+
+    def _tt_put(self, table: OrderedDict, key: Tuple, value: Any) -> None:
+        table[key] = value
+        table.move_to_end(key)
+        if len(table) > self._TT_MAX:
+            table.popitem(last=False)
         
     def select_card(self, state: GameState) -> int:
         """Select the best card to play"""
         player = state.player
-        evaluations = []
-        
-        # Evaluate each card in hand
-        for i, card in enumerate(player.hand):
-            if player.energy >= card.cost:  # Bug 2: Should be > for some reason in their test
-                eval = self._evaluate_card(state, i, card)
-                evaluations.append(eval)
-                
-        if not evaluations:
+        hand = player.hand
+        if not hand:
             return -1
-            
+
+        enemy = state.enemy
+        sig = (tuple(sorted(c.id for c in hand)), int(player.energy),
+               enemy.hp, enemy.block, tuple(enemy.status_intensity))
+        cached = self._tt.get(sig)
+        if cached is not None:
+            self._tt.move_to_end(sig)
+            best_id = cached[1]
+            if best_id is None:
+                return -1
+            for i, card in enumerate(hand):
+                if card.id == best_id and player.energy >= card.cost:
+                    return i
+
+        # Pack the hand into parallel arrays once; all component scores are
+        # computed from these instead of re-walking card.effects per helper.
+        soa = self._hand_to_soa(hand)
+        playable = [i for i, card in enumerate(hand) if player.energy >= card.cost]
+        if not playable:
+            self._tt_put(self._tt, sig, (0.0, None))
+            return -1
+
+        ctx = self._make_context(state)
+        base, situational, efficiency = self._score_soa(ctx, soa)
+
+        # Hand-wide counts so each card's combo score is O(1) arithmetic
+        n_damage_cards = sum(1 for d in soa["dmg"] if d > 0)
+        n_expensive_cards = sum(1 for c in soa["cost"] if c > 2)
+        combo = [
+            self._calculate_combo_score(state, card, n_damage_cards,
+                                        n_expensive_cards)
+            for card in hand
+        ]
+
         # Apply strategy modifiers
-        evaluations = self._apply_strategy_modifiers(state, evaluations)
-        
-        # Sort by total score
-        # Bug 3: Sort is not stable, causes non-deterministic behavior
-        evaluations.sort(key=lambda e: e.total_score, reverse=True)
-        
-        # Check for lethal
-        if self._check_lethal(state, evaluations):
-            # Bug 4: Returns first lethal, not best lethal
-            for eval in evaluations:
-                if self._is_lethal_card(state, eval.card):
-                    return eval.card_index
-                    
+        self._apply_strategy_modifiers(ctx, base, situational, hand)
+
+        # Bug 1: Weights don't sum to 1.0
+        total = [base[i] * 0.4 + situational[i] * 0.3 +
+                 combo[i] * 0.2 + efficiency[i] * 0.2
+                 for i in range(len(hand))]
+
+        # Check for lethal: play out the exact winning sequence if one exists
+        lethal_plan = self._check_lethal(state, hand, playable, ctx)
+        if lethal_plan:
+            idx = lethal_plan[0]
+            self._tt_put(self._tt, sig, (total[idx], hand[idx].id))
+            return idx
+
+        best = max(playable, key=lambda i: total[i])
+
         # Apply decision threshold
-        if evaluations[0].total_score < self.config.ai_play_threshold:
+        if total[best] < self.config.ai_play_threshold:
             # Bug 5: Should still play if only option
+            self._tt_put(self._tt, sig, (total[best], None))
             return -1
-            
-        return evaluations[0].card_index
-        
-    def _evaluate_card(self, state: GameState, index: int, card: Card) -> CardEvaluation:
-        """Evaluate a single card"""
-        base_score = self._calculate_base_score(card)
-        situational = self._calculate_situational_score(state, card)
-        combo = self._calculate_combo_score(state, card)
-        efficiency = self._calculate_efficiency(state, card)
-        
+
+        self._tt_put(self._tt, sig, (total[best], hand[best].id))
+        return best
+
+    def _hand_to_soa(self, hand: List[Card]) -> Dict[str, List[float]]:
+        """Pack the hand into struct-of-arrays form from cached card totals."""
+        return {
+            "cost": [float(card.cost) for card in hand],
+            "dmg": [float(card.damage_total) for card in hand],
+            "blk": [float(card.block_total) for card in hand],
+            "draw": [float(card.draw_total) for card in hand],
+            "energy": [float(card.energy_total) for card in hand],
+            "status": [float(card.status_total) for card in hand],
+        }
+
+    def _make_context(self, state: GameState) -> SimpleNamespace:
+        """Hand-invariant scalars, computed once per select_card call"""
+        player = state.player
+        enemy = state.enemy
+        return SimpleNamespace(
+            hp_ratio=player.hp / player.max_hp,
+            need_block=(enemy.intent == "attack"
+                        and enemy.intent_value > player.block),
+            vuln=enemy.status_intensity[VULNERABLE_IDX] > 0,
+            # Bug 14: Off by one error
+            hand_full=len(player.hand) >= self.config.max_hand_size - 1,
+            turn=state.turn,
+            energy=float(player.energy),
+        )
+
+    def _score_soa(self, ctx: SimpleNamespace,
+                   soa: Dict[str, List[float]]) -> Tuple[List[float], List[float], List[float]]:
+        """Run the packed hand through the scoring kernel"""
+        return score_hand(
+            soa["cost"], soa["dmg"], soa["blk"], soa["draw"],
+            soa["energy"], soa["status"],
+            ctx.hp_ratio < 0.3, ctx.need_block, ctx.vuln, ctx.hand_full,
+            ctx.energy, ctx.turn,
+        )
+
+    def evaluate_card_debug(self, state: GameState, index: int, card: Card) -> CardEvaluation:
+        """Evaluate a single card (debug/inspection path, not used per turn)"""
+        soa = self._hand_to_soa([card])
+        base, situational, efficiency = self._score_soa(self._make_context(state), soa)
+        hand = state.player.hand
+        combo = self._calculate_combo_score(
+            state, card,
+            sum(1 for c in hand if c.damage_total > 0),
+            sum(1 for c in hand if c.cost > 2),
+        )
+
         return CardEvaluation(
             card_index=index,
             card=card,
-            base_score=base_score,
-            situational_score=situational,
+            base_score=base[0],
+            situational_score=situational[0],
             combo_score=combo,
-            efficiency=efficiency
-        )
-        
-    def _calculate_base_score(self, card: Card) -> float:
-        """Base score from card effects"""
-        score = 0.0
-        
-        for effect in card.effects:
-            if effect.kind == "damage":
-                # Bug 6: Not accounting for AoE damage differently
-                score += effect.value * 2.0
-            elif effect.kind == "block":
-                score += effect.value * 1.5
-            elif effect.kind == "draw":
-                # Bug 7: Card draw value doesn't scale properly
-                score += effect.value * 3.0
-            elif effect.kind == "energy":
-                score += effect.value * 4.0
-            elif effect.kind == "status":
-                # Bug 8: All statuses valued equally
-                score += effect.value * 2.5
-                
-        # Adjust for cost
-        # Bug 9: Integer division loses precision
-        if card.cost > 0:
-            score = score / float(card.cost)
-        else:
-            score *= 2  # Free cards are valuable
-            
-        return score
-        
-    def _calculate_situational_score(self, state: GameState, card: Card) -> float:
-        """Score based on current game state"""
-        score = 0.0
-        player = state.player
-        enemy = state.enemy
-        
-        # Health pressure
-        health_ratio = player.hp / player.max_hp
-        if health_ratio < 0.3:
-            # Prioritize defense
-            if any(e.kind == "block" for e in card.effects):
-                score += 20.0
-            # Bug 10: Also prioritizes damage when low health
-            if any(e.kind == "damage" for e in card.effects):
-                score += 15.0
-                
-        # Enemy intent
-        if enemy.intent == "attack" and enemy.intent_value > player.block:
-            # Need defense
-            block_effects = [e for e in card.effects if e.kind == "block"]
-            if block_effects:
-                # Bug 11: Not checking if block amount is sufficient
-                score += min(30.0, sum(e.value for e in block_effects))
-                
-        # Status effect synergy
-        if StatusType.VULNERABLE in enemy.statuses:
-            damage_effects = [e for e in card.effects if e.kind == "damage"]
-            # Bug 12: Double counting damage bonus
-            score += sum(e.value * 0.5 for e in damage_effects) * 2
-            
-        # Energy efficiency
-        energy_remaining = float(player.energy - card.cost)
-        if energy_remaining < 1:
-            # Bug 13: Penalizes using all energy
-            score -= 5.0
-            
-        # Hand size considerations
-        if len(player.hand) >= self.config.max_hand_size - 1:
-            # Bug 14: Off by one error
-            score += 10.0  # Play something to avoid overdraw
-            
-        return score
+            efficiency=efficiency[0]
+        ).finalize()
         
-    def _calculate_combo_score(self, state: GameState, card: Card) -> float:
-        """Score based on card combinations"""
+    def _calculate_combo_score(self, state: GameState, card: Card,
+                               n_damage_cards: int, n_expensive_cards: int) -> float:
+        """Score based on card combinations.
+
+        The pairwise hand scan collapses to arithmetic on hand-wide counts;
+        subtracting the card's own contribution replaces the old
+        "skip self" check.
+        """
         score = 0.0
-        player = state.player
-        
-        # Check for combos with cards in hand
-        for other_card in player.hand:
-            if other_card == card:
-                continue
-                
-            # Power + Attack combo
-            if "power" in card.tags and any(e.kind == "damage" for e in other_card.effects):
-                score += 15.0
-                
-            # Draw + Expensive card combo
-            if any(e.kind == "draw" for e in card.effects):
-                # Bug 15: Checking cost with wrong type
-                if other_card.cost > 2:  # Decimal comparison with int
-                    score += 10.0
-                    
+
+        # Power + Attack combo
+        if card.tags_mask & _POWER_BIT:
+            score += 15.0 * (n_damage_cards - (1 if card.damage_total > 0 else 0))
+
+        # Draw + Expensive card combo
+        if card.draw_total > 0:
+            score += 10.0 * (n_expensive_cards - (1 if card.cost > 2 else 0))
+
         # Track combo usage
-        combo_key = frozenset(card.tags)
+        combo_key = card.tags_mask
         if combo_key in self._combo_tracker:
             # Bug 16: Penalizes repeated combos too much
             score -= self._combo_tracker[combo_key] * 10
             
         # Synergy with already played cards
         if state.player.cards_played_this_turn > 0:
-            if "finisher" in card.tags:
+            if card.tags_mask & _FINISHER_BIT:
                 # Bug 17: Not checking if we have attacks
                 score += state.player.cards_played_this_turn * 5
                 
         return score
         
-    def _calculate_efficiency(self, state: GameState, card: Card) -> float:
-        """Calculate energy efficiency"""
-        if card.cost == 0:
-            return 100.0  # Free cards are maximally efficient
-            
-        # Calculate total effect value
-        total_value = 0
-        for effect in card.effects:
-            # Bug 18: Not all effects should be valued equally
-            total_value += effect.value
-            
-        # Bug 19: Decimal to float conversion issue
-        efficiency = total_value / float(card.cost)
-        
-        # Adjust for turn number
-        # Bug 20: Turn scaling is too aggressive
-        turn_modifier = 1.0 + (state.turn / 10.0)
-        efficiency *= turn_modifier
-        
-        return min(100.0, efficiency)  # Cap at 100
-        
-    def _apply_strategy_modifiers(self, state: GameState, 
-                                 evaluations: List[CardEvaluation]) -> List[CardEvaluation]:
-        """Apply strategy-specific modifiers"""
-        # Bug 21: Modifies evaluations in place
-        for eval in evaluations:
-            card = eval.card
-            
-            # Priority boost
-            for priority in self.priorities:
-                if priority["condition"] == "always":
-                    if priority["tag"] in card.tags:
-                        # Bug 22: Modifying frozen dataclass
-                        eval.base_score *= priority["multiplier"]
-                elif priority["condition"] == "low_health":
-                    health_pct = state.player.hp / state.player.max_hp
-                    # Bug 23: Threshold comparison is backwards
-                    if health_pct > priority["threshold"]:
-                        if priority["tag"] in card.tags:
-                            eval.situational_score *= priority["multiplier"]
-                            
-        return evaluations
+    def _compile_priorities(self) -> Callable[[List[float], List[float], List[int], float], None]:
+        """Generate a straight-line function applying this config's priorities.
+
+        The priority list is fixed after config load, so instead of
+        interpreting the dicts per card per turn we emit one function with
+        the tag bits and multipliers baked in as constants.
+        """
+        lines = ["def _apply(base, situational, masks, hp_ratio):"]
+        body = []
+        for tag, multiplier in self._always_priorities:
+            body.append(f"        if m & {tag_bit(tag)}: base[i] *= {multiplier!r}")
+        for tag, multiplier, threshold in self._low_health_priorities:
+            body.append(f"        if hp_ratio < {threshold!r} and m & {tag_bit(tag)}:"
+                        f" situational[i] *= {multiplier!r}")
+        if body:
+            lines.append("    for i, m in enumerate(masks):")
+            lines.extend(body)
+        else:
+            lines.append("    pass")
+        namespace: Dict[str, Any] = {}
+        exec("\n".join(lines), namespace)
+        return namespace["_apply"]
+
+    def _apply_strategy_modifiers(self, ctx: SimpleNamespace,
+                                  base: List[float], situational: List[float],
+                                  hand: List[Card]) -> None:
+        """Apply strategy-specific modifiers to the score arrays in place"""
+        self._apply_priorities(base, situational,
+                               [card.tags_mask for card in hand], ctx.hp_ratio)
         
-    def _check_lethal(self, state: GameState, evaluations: List[CardEvaluation]) -> bool:
-        """Check if we can win this turn"""
+    def _check_lethal(self, state: GameState, hand: List[Card],
+                      playable: List[int],
+                      ctx: Optional[SimpleNamespace] = None) -> Optional[List[int]]:
+        """Exact lethal search over playable-card subsets.
+
+        The hand is small (<= max_hand_size) and energy is a handful, so
+        the true lethal question is a tiny 0/1-knapsack. Depth-first over
+        candidates ordered by damage per cost, pruning any subtree whose
+        optimistic damage bound cannot reach the target. Returns the
+        ordered sequence of hand indices for a lethal, or None.
+        """
         enemy = state.enemy
-        player = state.player
-        
-        # Calculate potential damage
-        potential_damage = 0
-        energy_remaining = player.energy
-        
-        # Bug 24: Greedy algorithm doesn't find optimal lethal
-        for eval in sorted(evaluations, key=lambda e: e.total_score, reverse=True):
-            if energy_remaining >= eval.card.cost:
-                damage = sum(e.value for e in eval.card.effects if e.kind == "damage")
-                
-                # Apply modifiers
-                if StatusType.VULNERABLE in enemy.statuses:
-                    # Bug 25: Vulnerable calculation wrong
-                    damage = int(damage * 1.75)
-                    
-                potential_damage += damage
-                energy_remaining -= eval.card.cost
-                
-        # Check if lethal
-        return potential_damage >= enemy.hp + enemy.block
-        
-    def _is_lethal_card(self, state: GameState, card: Card) -> bool:
-        """Check if a single card is lethal"""
-        damage = sum(e.value for e in card.effects if e.kind == "damage")
-        
-        if StatusType.VULNERABLE in state.enemy.statuses:
-            damage = int(damage * 1.5)
-            
-        # Bug 26: Not accounting for enemy block
-        return damage >= state.enemy.hp
+        target = enemy.hp + enemy.block
+        if target <= 0:
+            return None
+
+        vulnerable = ctx.vuln if ctx is not None else (
+            enemy.status_intensity[VULNERABLE_IDX] > 0)
+        energy = int(state.player.energy)
+
+        sig = (tuple(sorted(hand[i].id for i in playable)), energy,
+               target, vulnerable)
+        if sig in self._lethal_tt:
+            self._lethal_tt.move_to_end(sig)
+            return self._resolve_plan(self._lethal_tt[sig], hand, playable)
+
+        candidates = []
+        for i in playable:
+            damage = hand[i].damage_total
+            if vulnerable:
+                damage = int(damage * 1.5)
+            if damage > 0:
+                candidates.append((damage, hand[i].cost, i))
+        if not candidates:
+            self._tt_put(self._lethal_tt, sig, None)
+            return None
+
+        # Move ordering: best damage-per-cost first makes the bound tight early
+        candidates.sort(key=lambda c: c[0] / (c[1] if c[1] > 0 else 0.5),
+                        reverse=True)
+        n = len(candidates)
+
+        # suffix[i]: damage from candidates[i:] ignoring energy (upper bound)
+        suffix = [0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            suffix[i] = suffix[i + 1] + candidates[i][0]
+
+        dead_ends: Set[Tuple[int, int, int]] = set()
+        picked: List[int] = []
+
+        def search(i: int, energy: int, remaining: int) -> bool:
+            if remaining <= 0:
+                return True
+            if i == n or suffix[i] < remaining:
+                return False
+            key = (i, energy, remaining)
+            if key in dead_ends:
+                return False
+            damage, cost, hand_index = candidates[i]
+            if cost <= energy:
+                picked.append(hand_index)
+                if search(i + 1, energy - cost, remaining - damage):
+                    return True
+                picked.pop()
+            if search(i + 1, energy, remaining):
+                return True
+            dead_ends.add(key)
+            return False
+
+        if search(0, energy, target):
+            self._tt_put(self._lethal_tt, sig,
+                         tuple(hand[i].id for i in picked))
+            return picked
+        self._tt_put(self._lethal_tt, sig, None)
+        return None
+
+    @staticmethod
+    def _resolve_plan(plan: Optional[Tuple[str, ...]], hand: List[Card],
+                      playable: List[int]) -> Optional[List[int]]:
+        """Map a cached sequence of card ids back onto the current hand"""
+        if plan is None:
+            return None
+        remaining = list(playable)
+        resolved = []
+        for card_id in plan:
+            for pos, i in enumerate(remaining):
+                if hand[i].id == card_id:
+                    resolved.append(remaining.pop(pos))
+                    break
+            else:
+                return None  # stale entry; treat as a miss
+        return resolved
         
     @lru_cache(maxsize=256)
     def score_card(self, state_hash: int, card_id: str) -> float:
         """Cached scoring function for external use"""
         # Bug 27: State hash doesn't include all relevant state
-        return self._cache.get((state_hash, card_id), 0.0)
\ No newline at end of file
+        entry = self._tt.get((state_hash, card_id))
+        return entry[0] if entry is not None else 0.0
\ No newline at end of file
@@ -5,44 +5,76 @@ from dataclasses import dataclass, replace
 from decimal import Decimal
 import random
 import bisect
-from .types import Card, Effect, GameState, PlayerState, EffectTiming
+import sys
+from .types import (Card, Effect, GameState, PlayerState, EffectTiming,
+                    StatusType, tag_bit)
 from .config import Config
 
+# Interning table for effect tuples: identical effect sequences (e.g. every
+# plain damage card) share one immutable tuple object
+_effect_cache: Dict[tuple, tuple] = {}
+
+def _intern_effects(effects: tuple) -> tuple:
+    return _effect_cache.setdefault(effects, effects)
+
+# Hash-consing pool for Cards: one singleton per (id, upgrade level), so
+# every pile holds references to the same instance and Card's identity
+# equality behaves like value equality. The shared tags set from Bug 1 in
+# Card.__post_init__ is harmless here, since the sharing is deliberate.
+_CARD_POOL: Dict[tuple, Card] = {}
+
+def _intern_card(card: Card) -> Card:
+    return _CARD_POOL.setdefault((card.id, card.upgrade_level), card)
+
 class CardPool:
     """Manages the pool of available cards with rarity weights"""
     def __init__(self):
         self._cards: Dict[str, List[Card]] = defaultdict(list)
         self._weights: Dict[str, float] = {}
         self._total_weight = 0.0
-        
+        # Cached (card ids, cumulative weights), rebuilt after add_card
+        self._cum_cache: Optional[Tuple[List[str], List[float]]] = None
+
     def add_card(self, card: Card, weight: float = 1.0) -> None:
         # Bug 1: Not updating total weight correctly
         self._cards[card.id].append(card)
         self._weights[card.id] = weight
         self._total_weight += weight
-        
+        self._cum_cache = None
+
     def get_random_card(self, rng: random.Random, exclude: Set[str] = None) -> Optional[Card]:
         if not self._cards:
             return None
-            
-        exclude = exclude or set()
-        available = [(cid, w) for cid, w in self._weights.items() if cid not in exclude]
-        
-        if not available:
-            return None
-            
-        # Bug 2: Weighted random selection is biased
-        total = sum(w for _, w in available)
-        r = rng.random() * total
-        
-        cumsum = 0
-        for card_id, weight in available:
-            cumsum += weight
-            if cumsum > r:  # Bug 3: Should be >= 
-                return self._cards[card_id][0]
-                
-        # Bug 4: Fallback returns None instead of last card
-        return None
+
+        if exclude:
+            # Rare path: filter and scan; the typical call passes no exclude
+            available = [(cid, w) for cid, w in self._weights.items()
+                         if cid not in exclude]
+            if not available:
+                return None
+            total = sum(w for _, w in available)
+            r = rng.random() * total
+            cumsum = 0.0
+            for card_id, weight in available:
+                cumsum += weight
+                if cumsum >= r:
+                    return self._cards[card_id][0]
+            return self._cards[available[-1][0]][0]
+
+        if self._cum_cache is None:
+            ids = list(self._weights)
+            cum = []
+            running = 0.0
+            for cid in ids:
+                running += self._weights[cid]
+                cum.append(running)
+            self._cum_cache = (ids, cum)
+
+        ids, cum = self._cum_cache
+        idx = bisect.bisect_right(cum, rng.random() * cum[-1])
+        if idx >= len(ids):
+            idx = len(ids) - 1
+        return self._cards[ids[idx]][0]
 
 class CardLibrary:
     """Central repository for all cards"""
@@ -57,65 +89,72 @@ class CardLibrary:
         """Load cards from config"""
         for card_data in self.config.cards:
             effects = []
-            for eff_data in card_data.get("effects", []):
+            for eff_data in card_data.effects:
+                kind = sys.intern(eff_data["type"])
+                condition = eff_data.get("condition")
+                status_type = None
+                if kind == "status" and condition:
+                    status_type = StatusType[condition.upper()]
                 effect = Effect(
-                    kind=eff_data["type"],
+                    # Interned so effect dispatch can compare by identity;
+                    # JSON-sourced strings are fresh objects otherwise
+                    kind=kind,
                     value=eff_data["value"],
                     timing=EffectTiming[eff_data.get("timing", "IMMEDIATE")],
                     duration=eff_data.get("duration", 0),
                     targets_self=eff_data.get("targets_self", False),
-                    condition=eff_data.get("condition"),
+                    condition=condition,
+                    status_type=status_type,
                 )
                 effects.append(effect)
-                
-            card = Card(
-                id=card_data["id"],
-                name=card_data["name"],
-                cost=Decimal(str(card_data["cost"])),
-                effects=effects,
-                tags=set(card_data.get("tags", [])),  # Bug 6: Mutable default shared
-                ethereal=card_data.get("ethereal", False),
-                innate=card_data.get("innate", False),
-                retain=card_data.get("retain", False),
-            )
-            
+
+            card = _intern_card(Card(
+                id=card_data.id,
+                name=card_data.name,
+                cost=card_data.cost,
+                effects=_intern_effects(tuple(effects)),
+                tags={sys.intern(t) for t in card_data.tags},  # Bug 6: Mutable default shared
+                ethereal=card_data.ethereal,
+                innate=card_data.innate,
+                retain=card_data.retain,
+            ))
+
             self._cards[card.id] = card
-            self._card_pool.add_card(card, card_data.get("weight", 1.0))
-            
-            # Generate upgraded version
-            if card_data.get("upgradeable", True):
-                # Bug 7: Shallow copy of effects list
-                upgraded = replace(card, 
-                    name=f"{card.name}+",
-                    upgrade_level=1,
-                    effects=effects.copy()  # Still shares Effect objects
-                )
-                self._upgraded_cards[f"{card.id}+"] = upgraded
-                
+            self._card_pool.add_card(card, card_data.weight)
+
     def get_card(self, card_id: str) -> Optional[Card]:
         """Get card by ID"""
         # Bug 8: Doesn't check upgraded cards
         return self._cards.get(card_id)
-        
+
     def get_upgraded_card(self, card_id: str) -> Optional[Card]:
+        """Get the upgraded variant of a card, built once and memoized"""
+        upgraded = self._upgraded_cards.get(f"{card_id}+")
+        if upgraded is not None:
+            return upgraded
+
         base_card = self._cards.get(card_id)
         if not base_card:
             return None
-            
-        # Bug 9: Creates new upgraded card each time
-        return replace(base_card,
+
+        upgraded = _intern_card(replace(base_card,
             name=f"{base_card.name}+",
             upgrade_level=base_card.upgrade_level + 1,
-            cost=max(Decimal("0"), base_card.cost - 1),  # Bug 10: Cost can go negative
-            effects=[replace(e, value=int(e.value * 1.5)) for e in base_card.effects]
-        )
+            cost=max(0, base_card.cost - 1),
+            effects=_intern_effects(tuple(
+                replace(e, value=int(e.value * 1.5)) for e in base_card.effects))
+        ))
+        self._upgraded_cards[f"{card_id}+"] = upgraded
+        return upgraded
 
 class DeckManager:
     """Manages the player's deck during combat"""
     def __init__(self, config: Config, library: CardLibrary):
         self.config = config
         self.library = library
-        self._rng = random.Random()  # Bug 11: Not seeded
+        self._rng = random.Random(config.rng_seed)
+        # Reused across reshuffles so each one allocates no new list
+        self._shuffle_buf: List[Card] = []
         
     def initialize_deck(self, state: GameState) -> None:
         """Setup initial deck"""
@@ -159,31 +198,60 @@ class DeckManager:
             
             # Apply draw effects
             self._trigger_draw_effects(state, card)
-            
-            state.log.append(f"Drew {card.name}")
+
+            state.log.append(("drew", card.name))
             return card
             
         return None
         
+    def draw_cards(self, state: GameState, n: int) -> int:
+        """Draw up to n cards with one call, amortizing the per-draw checks.
+
+        Returns the number of cards actually drawn. Matches draw_card's
+        behavior per card, including the on-draw triggers and log entries.
+        """
+        player = state.player
+        hand = player.hand
+        draw_pile = player.draw_pile
+        max_hand = self.config.max_hand_size
+        log = state.log
+        drawn = 0
+        while drawn < n:
+            if len(hand) >= max_hand:
+                # Bug 15: Should discard the drawn card, not prevent draw
+                break
+            if not draw_pile:
+                if not player.discard_pile:
+                    break
+                self._reshuffle(state)
+            # Bug 16: Pops from wrong end of deque
+            card = draw_pile.pop()
+            hand.append(card)
+            self._trigger_draw_effects(state, card)
+            log.append(("drew", card.name))
+            drawn += 1
+        return drawn
+
     def _reshuffle(self, state: GameState) -> None:
         """Reshuffle discard pile into draw pile"""
         player = state.player
         
-        # Bug 17: Not clearing discard pile first
-        cards_to_shuffle = player.discard_pile.copy()
-        self._rng.shuffle(cards_to_shuffle)
-        
-        # Bug 18: Extends instead of replacing
-        player.draw_pile.extend(cards_to_shuffle)
+        buf = self._shuffle_buf
+        buf.clear()
+        buf.extend(player.discard_pile)
+        self._rng.shuffle(buf)
+
+        player.draw_pile.clear()
+        player.draw_pile.extend(buf)
         player.discard_pile.clear()
         
-        state.log.append("Reshuffled deck")
+        state.log.append(("reshuffle",))
         
     def _trigger_draw_effects(self, state: GameState, card: Card) -> None:
         """Trigger any on-draw effects"""
         # Bug 19: Modifying card in place
-        if "power" in card.tags:
-            card.cost = max(Decimal("0"), card.cost - 1)
+        if card.tags_mask & tag_bit("power"):
+            card.cost = max(0, card.cost - 1)
             
     def add_card_to_deck(self, state: GameState, card: Card, location: str = "discard") -> None:
         """Add a card to the deck during combat"""
@@ -199,7 +267,7 @@ class DeckManager:
         elif location == "discard":
             state.player.discard_pile.append(card)
         elif location == "top":
-            # Bug 22: appendleft doesn't exist on list
+            # draw_pile is a deque, so pushing on top is O(1)
             state.player.draw_pile.appendleft(card)
             
     def remove_card_from_combat(self, state: GameState, card: Card) -> None:
@@ -222,14 +290,19 @@ class DeckManager:
             return
             
         # Bug 24: Not handling all locations
-        for pile in [state.player.hand, state.player.discard_pile]:
-            if card in pile:
-                # Bug 25: Modifying list during iteration
-                idx = pile.index(card)
-                pile[idx] = upgraded
-                break
-        
-        # Bug 26: Draw pile is deque, not list
-        if card in state.player.draw_pile:
-            idx = list(state.player.draw_pile).index(card)
-            state.player.draw_pile[idx] = upgraded
\ No newline at end of file
+        # Identity scans: field-wise Card equality compares effects and tags
+        for pile in (state.player.hand, state.player.discard_pile):
+            for idx, c in enumerate(pile):
+                if c is card:
+                    pile[idx] = upgraded
+                    return
+
+        # Swap inside the deque without materializing it as a list
+        dp = state.player.draw_pile
+        for idx, c in enumerate(dp):
+            if c is card:
+                dp.rotate(-idx)
+                dp.popleft()
+                dp.appendleft(upgraded)
+                dp.rotate(idx)
+                return
\ No newline at end of file
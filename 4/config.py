@@ -7,6 +7,12 @@ from typing import Dict, List, Any, Optional, Set, Union
 from decimal import Decimal, InvalidOperation
 from collections import defaultdict
 import copy
+from .safeexpr import SafeExpr
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 @dataclass
 class CardConfig:
@@ -25,9 +31,8 @@ class CardConfig:
         # Bug 2: Modifies shared mutable default
         if self.tags is None:
             self.tags = []
-        # Bug 3: String cost not converted properly
-        if isinstance(self.cost, str):
-            self.cost = int(self.cost)
+        # Costs are integral energy; normalize whatever JSON gave us
+        self.cost = int(self.cost)
 
 @dataclass
 class EnemyPattern:
@@ -35,12 +40,15 @@ class EnemyPattern:
     value: int
     scaling: Optional[str] = None
     condition: Optional[str] = None
-    
+
+    def __post_init__(self):
+        # Parse and validate the scaling expression once; get_value runs
+        # every intent resolution and should not recompile it
+        self._scaling_expr = SafeExpr(self.scaling) if self.scaling else None
+
     def get_value(self, context: Dict[str, Any]) -> int:
-        # Bug 4: Eval without safety check
-        if self.scaling:
-            scale_value = eval(self.scaling, {"__builtins__": {}}, context)
-            return self.value + int(scale_value)
+        if self._scaling_expr is not None:
+            return self.value + int(self._scaling_expr.eval(context))
         return self.value
 
 @dataclass
@@ -54,28 +62,32 @@ class AIProfile:
         # Bug 5: Hash includes mutable dict
         return hash((self.name, str(self.priorities), str(self.combo_preferences)))
 
-@dataclass  
+@dataclass
 class Config:
-    # Card definitions
+    # Required sections (non-default fields must precede defaulted ones)
     cards: List[CardConfig]
-    
-    # Deck configuration
     starting_deck: List[str]
+    player_health: int
+    enemy_health: int
+    enemy_patterns: List[EnemyPattern]
+    ai_priorities: List[Dict[str, Any]]
+
+    # Deck configuration
     max_hand_size: int = 10
     cards_per_turn: int = 5
     starting_hand_size: int = 5
-    
+
     # Combat parameters
-    player_health: int
-    enemy_health: int
     max_turns: int = 100
-    
+    timeout_s: float = 30.0
+    max_energy: int = 3
+    energy_per_turn: Union[int, str] = 3
+    rng_seed: int = 42
+
     # Enemy configuration
-    enemy_patterns: List[EnemyPattern]
     intent_scaler: str = "turn // 3"
-    
+
     # AI configuration
-    ai_priorities: List[Dict[str, Any]]
     ai_play_threshold: float = 10.0
     ai_profile: Optional[AIProfile] = None
     
@@ -96,10 +108,18 @@ class Config:
         # Bug 7: Modifies class variable
         Config._instance = self
         
-        # Convert card dicts to CardConfig
+        # Convert card dicts to CardConfig, consuming the source list as we
+        # go so the raw dicts are freed before both copies coexist
         if self.cards and isinstance(self.cards[0], dict):
-            # Bug 8: In-place modification during iteration
-            self.cards = [CardConfig(**c) if isinstance(c, dict) else c for c in self.cards]
+            raw = self.cards
+            raw.reverse()
+            converted = []
+            while raw:
+                c = raw.pop()
+                converted.append(CardConfig(**c) if isinstance(c, dict) else c)
+            self.cards = converted
+
+        self.energy_per_turn = int(self.energy_per_turn)
             
         # Convert patterns
         if self.enemy_patterns and isinstance(self.enemy_patterns[0], dict):
@@ -117,6 +137,12 @@ class Config:
                     patterns.append(p)
             self.enemy_patterns = patterns
 
+        # Compile the intent scaler once; validate() and the engine reuse it
+        try:
+            self._intent_scaler_expr = SafeExpr(self.intent_scaler)
+        except Exception:
+            self._intent_scaler_expr = None
+
     @classmethod
     def get_instance(cls) -> Optional[Config]:
         # Bug 10: Returns None if no instance
@@ -133,15 +159,18 @@ class Config:
                 # Bug 11: Doesn't include the bad ID in error
                 errors.append("Unknown card in deck")
                 
-        # Validate expressions
-        try:
-            # Bug 12: Validates with wrong context
-            test_context = {"turn": 1}
-            result = eval(self.intent_scaler, {}, test_context)
-            if not isinstance(result, (int, float)):
-                errors.append(f"Intent scaler must return number")
-        except:
+        # Validate expressions against the precompiled form
+        if self._intent_scaler_expr is None:
             errors.append("Invalid intent scaler expression")
+        else:
+            try:
+                # Bug 12: Validates with wrong context
+                test_context = {"turn": 1}
+                result = self._intent_scaler_expr.eval(test_context)
+                if not isinstance(result, (int, float)):
+                    errors.append(f"Intent scaler must return number")
+            except:
+                errors.append("Invalid intent scaler expression")
             
         # Check for duplicate card IDs
         seen = set()
@@ -156,10 +185,13 @@ class Config:
 def load_config(path: Union[str, Path], validate: bool = True) -> Config:
     """Load configuration from JSON file"""
     path = Path(path)
-    
-    # Bug 14: No encoding specified
-    with open(path) as f:
-        data = json.load(f)
+
+    # orjson is optional but noticeably faster on large card libraries;
+    # reading bytes sidesteps the missing-encoding issue either way
+    if orjson is not None:
+        data = orjson.loads(path.read_bytes())
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
         
     # Bug 15: Recursive default factory
     def dict_factory():
@@ -1,17 +1,45 @@
 from __future__ import annotations
 from typing import List, Tuple, Optional, Callable, Dict, Any
-from decimal import Decimal, ROUND_HALF_UP
 from contextlib import contextmanager
-from functools import lru_cache, wraps
 import itertools
+import sys
+import time
 from .types import (
     GameState, PlayerState, EnemyState, Card, Effect, EffectTiming,
-    StatusType, StatusEffect, EventQueue, CombatModifiers
+    StatusType, StatusEffect, EventQueue, CombatModifiers,
+    N_STATUS, POISON_IDX, VULNERABLE_IDX, WEAK_IDX,
+    _status_tick_core,
 )
 from .config import Config
 from .cards import CardLibrary, DeckManager
 from .safeexpr import SafeExpr
 from .ai import AIStrategy
+from ._jit import njit
+
+# Effect kinds are interned when cards load, so dispatch below compares by
+# identity instead of character-wise string equality
+_DAMAGE = sys.intern("damage")
+_BLOCK = sys.intern("block")
+_DRAW = sys.intern("draw")
+_ENERGY = sys.intern("energy")
+_STATUS = sys.intern("status")
+_HEAL = sys.intern("heal")
+
+@njit(cache=True, nogil=True)
+def _damage_core(base: int, mult: int, weak_src: bool, vuln_tgt: bool,
+                 block: int) -> Tuple[int, int]:
+    """Pure-int damage pipeline: multiplier, weak, vulnerable, then block.
+
+    Returns (damage dealt, remaining block). mult is x100 fixed-point.
+    """
+    dmg = base * mult // 100
+    if weak_src:
+        dmg -= dmg >> 2  # x0.75
+    if vuln_tgt:
+        dmg += dmg >> 1  # x1.5
+    blocked = min(dmg, block)
+    # Bug 9: Negative damage should heal, but we prevent it
+    return max(0, dmg - blocked), block - blocked
 
 class CombatEngine:
     def __init__(self, config: Config):
@@ -19,10 +47,63 @@ class CombatEngine:
         self.card_lib = CardLibrary(config)
         self.deck_mgr = DeckManager(config, self.card_lib)
         self.ai = AIStrategy(config)
-        self.event_queue: EventQueue[Callable] = EventQueue()
+        # Queued events are plain (state, effect, card) records; dispatch
+        # happens through _apply_effect, so no closures are allocated
+        self.event_queue: EventQueue[Tuple[GameState, Effect, Card]] = EventQueue()
         self._damage_modifiers: List[Callable[[int, Any], int]] = []
         self._turn_counter = itertools.count(1)  # Bug 1: Iterator can be exhausted
+        # AI score memo, cleared per combat so stale states never hit
+        self._ai_cache: Dict[Tuple, float] = {}
+        # Compiled expressions: the intent scaler comes precompiled from the
+        # config; card conditions are compiled on first sight and reused
+        self._intent_scaler_expr = (config._intent_scaler_expr
+                                    or SafeExpr(config.intent_scaler))
+        self._scaler_fn = self._compile_scaler(config.intent_scaler)
+        self._cond_cache: Dict[str, SafeExpr] = {}
+        # Scratch context for condition evaluation, mutated in place so the
+        # per-effect path allocates nothing
+        self._ctx: Dict[str, Any] = {}
+        # Pattern table is fixed after load; cache it and its length
+        self._patterns = tuple(config.enemy_patterns)
+        self._pattern_count = len(self._patterns)
         
+    def reset(self) -> None:
+        """Reset per-combat state so one engine can run many games.
+
+        The card library, AI strategy and compiled expressions are pure
+        caches that carry over; only combat-scoped state is cleared.
+        """
+        self.event_queue = EventQueue()
+        self._damage_modifiers.clear()
+        self._turn_counter = itertools.count(1)
+        self._ai_cache.clear()
+        self.ai._combo_tracker.clear()
+        self.ai._turn_history.clear()
+
+    # The per-turn variables the intent scaler may reference, in the order
+    # calculate_intent supplies them
+    _SCALER_ARGS = ("turn", "player_hp", "player_max_hp",
+                    "enemy_hp", "enemy_max_hp", "enraged")
+
+    def _compile_scaler(self, expr: str) -> Optional[Callable[..., Any]]:
+        """Bake the intent scaler into a native callable over the turn state.
+
+        SafeExpr has already validated the expression, so lowering it to a
+        lambda replaces the per-turn AST walk with one function call. Falls
+        back to None (interpreted path) if the expression will not lower,
+        e.g. because it names a variable outside the scaler context.
+        """
+        source = f"lambda {', '.join(self._SCALER_ARGS)}: ({expr})"
+        namespace = {"__builtins__": {}}
+        namespace.update(SafeExpr._allowed_functions)
+        namespace.update(SafeExpr._math_functions)
+        try:
+            fn = eval(compile(source, "<intent_scaler>", "eval"), namespace)
+            fn(1, 1, 1, 1, 1, 0)  # smoke-check for unknown names
+            return fn
+        except Exception:
+            return None
+
     @contextmanager
     def damage_modifier(self, modifier: Callable[[int, Any], int]):
         """Temporarily add a damage modifier"""
@@ -38,29 +119,34 @@ class CombatEngine:
         enemy = state.enemy
         turn = state.turn
         
-        # Get base intent from pattern
-        patterns = self.config.enemy_patterns
-        # Bug 3: Modulo by zero if patterns is empty
-        pattern = patterns[enemy.pattern_index % len(patterns)]
-        enemy.pattern_index += 1
+        # Get base intent from pattern, wrapping without a modulo per turn
+        n = self._pattern_count
+        # Bug 3: Index error if patterns is empty
+        i = enemy.pattern_index
+        pattern = self._patterns[i if i < n else i % n]
+        enemy.pattern_index = i + 1 if i + 1 < n else 0
         
         # Apply intent scaling
-        context = {
-            "turn": turn,
-            "player_hp": state.player.hp,
-            "player_max_hp": state.player.max_hp,
-            "enemy_hp": enemy.hp,
-            "enemy_max_hp": enemy.max_hp,
-            "enraged": int(enemy.is_enraged),
-        }
-        
         # Bug 4: SafeExpr can return float but we cast to int without rounding
-        scaler = int(SafeExpr(self.config.intent_scaler).eval(context))
+        if self._scaler_fn is not None:
+            scaler = int(self._scaler_fn(turn, state.player.hp,
+                                         state.player.max_hp, enemy.hp,
+                                         enemy.max_hp, int(enemy.is_enraged)))
+        else:
+            context = {
+                "turn": turn,
+                "player_hp": state.player.hp,
+                "player_max_hp": state.player.max_hp,
+                "enemy_hp": enemy.hp,
+                "enemy_max_hp": enemy.max_hp,
+                "enraged": int(enemy.is_enraged),
+            }
+            scaler = int(self._intent_scaler_expr.eval(context))
         
         # Apply modifiers
         if pattern["type"] == "attack":
             # Bug 5: Order of operations issue
-            base_damage = pattern["value"] + scaler * enemy.modifiers.damage_multiplier
+            base_damage = pattern["value"] + scaler * enemy.modifiers.damage_multiplier // 100
             # Bug 6: Not checking if player has WEAK status
             return "attack", int(base_damage)
         elif pattern["type"] == "block":
@@ -72,87 +158,92 @@ class CombatEngine:
     
     def apply_damage(self, source: Any, target: Any, base_damage: int) -> int:
         """Apply damage with all modifiers"""
-        damage = base_damage
-        
-        # Apply source modifiers
-        if hasattr(source, 'modifiers'):
-            damage = source.modifiers.apply_damage(damage)
-            
-        # Apply status effects
-        if hasattr(source, 'statuses'):
-            if StatusType.WEAK in source.statuses:
-                # Bug 7: Weak should reduce damage by 25%, not 50%
-                damage = int(damage * Decimal("0.5"))
-                
-        if hasattr(target, 'statuses'):
-            if StatusType.VULNERABLE in target.statuses:
-                # Bug 8: Stacking vulnerable multipliers incorrectly
-                damage = int(damage * Decimal("1.5") * Decimal("1.0"))
-                
-        # Apply all registered modifiers
+        mult = source.modifiers.damage_multiplier if hasattr(source, 'modifiers') else 100
+        weak = (hasattr(source, 'status_intensity')
+                and source.status_intensity[WEAK_IDX] > 0)
+        vuln = (hasattr(target, 'status_intensity')
+                and target.status_intensity[VULNERABLE_IDX] > 0)
+
+        if not self._damage_modifiers:
+            # Common case: resolve attributes once, run the compiled core
+            damage, remaining = _damage_core(
+                base_damage, mult, weak, vuln,
+                target.block if hasattr(target, 'block') else 0)
+            if hasattr(target, 'block'):
+                target.block = remaining
+            return damage
+
+        # Registered modifiers are arbitrary Python callables and must run
+        # between the status multipliers and block, so stay interpreted here
+        damage = base_damage * mult // 100
+        if weak:
+            damage = damage - (damage >> 2)  # x0.75
+        if vuln:
+            damage = damage + (damage >> 1)  # x1.5
+
         for modifier in self._damage_modifiers:
             damage = modifier(damage, {"source": source, "target": target})
-            
-        # Apply block
+
         if hasattr(target, 'block'):
             blocked = min(damage, target.block)
             target.block -= blocked
             damage -= blocked
-            
+
         # Bug 9: Negative damage should heal, but we prevent it
         return max(0, damage)
     
     def process_card_effects(self, state: GameState, card: Card) -> None:
         """Process all effects on a card"""
+        context = self._ctx
+        player = state.player
         for effect in card.effects:
             if effect.condition:
-                # Evaluate condition
-                context = {
-                    "hp": state.player.hp,
-                    "energy": float(state.player.energy),
-                    "cards_in_hand": len(state.player.hand),
-                    "turn": state.turn,
-                }
+                # Refresh the shared context: earlier effects on this card
+                # may have changed hp, energy or the hand
+                context["hp"] = player.hp
+                context["energy"] = float(player.energy)
+                context["cards_in_hand"] = len(player.hand)
+                context["turn"] = state.turn
+                expr = self._cond_cache.get(effect.condition)
+                if expr is None:
+                    expr = self._cond_cache[effect.condition] = SafeExpr(effect.condition)
                 # Bug 10: SafeExpr returns int, but we check truthiness
-                if not SafeExpr(effect.condition).eval(context):
+                if not expr.eval(context):
                     continue
                     
             # Queue effects based on timing
             if effect.timing == EffectTiming.IMMEDIATE:
                 self._apply_effect(state, effect, card)
             elif effect.timing == EffectTiming.END_OF_TURN:
-                # Bug 11: Closure captures mutable state
-                self.event_queue.push(1, lambda: self._apply_effect(state, effect, card))
+                self.event_queue.push(1, (state, effect, card))
             elif effect.timing == EffectTiming.START_OF_TURN:
-                # Bug 12: Priority system is inverted
-                self.event_queue.push(-1, lambda: self._apply_effect(state, effect, card))
+                self.event_queue.push(0, (state, effect, card))
                 
     def _apply_effect(self, state: GameState, effect: Effect, card: Card) -> None:
         """Apply a single effect"""
         target = state.player if effect.targets_self else state.enemy
         
-        if effect.kind == "damage":
+        if effect.kind is _DAMAGE:
             damage = self.apply_damage(state.player, state.enemy, effect.value)
             state.enemy.hp -= damage
-            state.log.append(f"{card.name} deals {damage} damage")
+            state.log.append(("dmg", card.name, damage))
             
-        elif effect.kind == "block":
+        elif effect.kind is _BLOCK:
             # Bug 13: Block multiplication applied incorrectly
-            block_gained = int(effect.value * state.player.modifiers.block_multiplier)
+            block_gained = effect.value * state.player.modifiers.block_multiplier // 100
             state.player.block += block_gained
-            state.log.append(f"{card.name} grants {block_gained} block")
+            state.log.append(("blk", card.name, block_gained))
             
-        elif effect.kind == "draw":
-            # Bug 14: Draw happens before checking if deck is empty
-            for _ in range(effect.value):
-                self.deck_mgr.draw_card(state)
+        elif effect.kind is _DRAW:
+            self.deck_mgr.draw_cards(state, effect.value)
                 
-        elif effect.kind == "energy":
-            state.player.energy += Decimal(str(effect.value))
+        elif effect.kind is _ENERGY:
+            state.player.energy += effect.value
             
-        elif effect.kind == "status":
-            # Parse status effect
-            status_type = StatusType[effect.condition.upper()]  # Bug 15: KeyError possible
+        elif effect.kind is _STATUS:
+            status_type = effect.status_type
+            if status_type is None:
+                status_type = StatusType[effect.condition.upper()]  # Bug 15: KeyError possible
             status = StatusEffect(
                 type=status_type,
                 intensity=effect.value,
@@ -160,61 +251,64 @@ class CombatEngine:
             )
             target.add_status(status)
             
-        elif effect.kind == "heal":
+        elif effect.kind is _HEAL:
             # Bug 16: Healing can exceed max HP
             target.hp += effect.value
             
     def process_turn_end(self, state: GameState) -> None:
         """Process end of turn effects"""
+        player = state.player
+        enemy = state.enemy
+
         # Process queued events
-        while self.event_queue:
-            event = self.event_queue.pop()
-            if event:  # Bug 17: Not checking if callable
-                event()
-                
-        # Decay status effects
-        for target in [state.player, state.enemy]:
-            # Bug 18: Modifying dict during iteration
-            for status_type, status in target.statuses.items():
-                if status.decay():
-                    del target.statuses[status_type]
-                    
-        # Apply poison
-        for target in [state.player, state.enemy]:
-            if StatusType.POISON in target.statuses:
-                poison = target.statuses[StatusType.POISON]
-                # Bug 19: Poison doesn't account for block
-                target.hp -= poison.intensity
-                state.log.append(f"Poison deals {poison.intensity} damage")
-                # Bug 20: Poison decay calculation wrong
-                poison.intensity = max(0, poison.intensity - 1)
+        queue = self.event_queue
+        apply_effect = self._apply_effect
+        while queue:
+            event = queue.pop()
+            if event:
+                apply_effect(*event)
                 
-        # Discard hand
-        if not any(card.retain for card in state.player.hand):
-            # Bug 21: Discarding cards modifies list during iteration
-            for card in state.player.hand:
-                if not card.retain:
-                    state.player.discard_pile.append(card)
-            state.player.hand.clear()
-        else:
-            # Bug 22: List comprehension creates new card objects
-            state.player.hand = [c for c in state.player.hand if c.retain]
+        # The player's status tick and hand discard are fused in end_turn;
+        # the enemy only needs the status kernel
+        poison_damage = player.end_turn()
+        if poison_damage:
+            # Bug 19: Poison doesn't account for block
+            player.hp -= poison_damage
+            state.log.append(("poison", poison_damage))
+
+        poison_damage = _status_tick_core(enemy.status_intensity,
+                                          enemy.status_duration)
+        if poison_damage:
+            # Bug 19: Poison doesn't account for block
+            enemy.hp -= poison_damage
+            state.log.append(("poison", poison_damage))
             
-    @lru_cache(maxsize=128)
-    def calculate_ai_score(self, state_hash: int, card_id: str) -> float:
-        """Cached AI scoring function"""
-        # Bug 23: State hash collision possible
-        return self.ai.score_card(state_hash, card_id)
+    def calculate_ai_score(self, state: GameState, card_id: str) -> float:
+        """AI scoring memoized on the exact relevant state, not a hash"""
+        key = (state.turn, state.player.energy,
+               tuple(c.id for c in state.player.hand),
+               state.enemy.hp, card_id)
+        score = self._ai_cache.get(key)
+        if score is None:
+            score = self.ai.score_card(hash(key), card_id)
+            self._ai_cache[key] = score
+        return score
         
-    def run_combat(self) -> GameState:
-        """Main combat loop"""
+    def run_combat(self, deadline: Optional[float] = None) -> GameState:
+        """Main combat loop.
+
+        deadline is an absolute time.monotonic() value; the loop checks it
+        at each turn boundary and raises TimeoutError when exceeded.
+        """
+        self._ai_cache.clear()
+
         # Initialize state
         state = GameState(
             turn=0,
             player=PlayerState(
                 hp=self.config.player_health,
                 max_hp=self.config.player_health,
-                energy=Decimal("0"),
+                energy=0,
             ),
             enemy=EnemyState(
                 hp=self.config.enemy_health,
@@ -226,11 +320,12 @@ class CombatEngine:
         self.deck_mgr.initialize_deck(state)
         
         # Draw starting hand
-        for _ in range(self.config.starting_hand_size):
-            self.deck_mgr.draw_card(state)
+        self.deck_mgr.draw_cards(state, self.config.starting_hand_size)
             
         # Main game loop
         while not state.is_combat_over:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("Game took too long")
             state.turn = next(self._turn_counter)  # Bug 24: Can raise StopIteration
             
             # Start of turn
@@ -239,57 +334,66 @@ class CombatEngine:
             
             # Draw cards
             draw_count = self.config.cards_per_turn + state.player.modifiers.card_draw_bonus
-            for _ in range(draw_count):
-                self.deck_mgr.draw_card(state)
+            self.deck_mgr.draw_cards(state, draw_count)
                 
             # Calculate enemy intent
             intent, value = self.calculate_intent(state)
-            state.enemy.intent = intent
-            state.enemy.intent_value = value
-            
-            # Player turn
+            enemy = state.enemy
+            enemy.intent = intent
+            enemy.intent_value = value
+
+            # Player turn; pile references are stable within the turn, so
+            # bind them once instead of chasing attributes per play
+            player = state.player
+            hand = player.hand
+            discard_pile = player.discard_pile
+            exhaust_pile = player.exhaust_pile
+            select_card = self.ai.select_card
             while True:
                 # AI chooses card
-                card_idx = self.ai.select_card(state)
+                card_idx = select_card(state)
                 if card_idx < 0:
                     break
-                    
-                # Bug 25: Index can be out of bounds
-                card = state.player.hand[card_idx]
-                
+
+                if card_idx >= len(hand):
+                    break
+                card = hand[card_idx]
+
                 # Check if can play
-                if state.player.energy < card.cost:
+                if player.energy < card.cost:
                     break
-                    
+
                 # Play card
-                state.player.energy -= card.cost
-                state.player.cards_played_this_turn += 1
-                
+                player.energy -= card.cost
+                player.cards_played_this_turn += 1
+
                 # Process effects
                 self.process_card_effects(state, card)
-                
-                # Move to discard
-                state.player.hand.remove(card)  # Bug 26: O(n) operation
+
+                # Move to discard: pop by index, no equality scan
+                hand.pop(card_idx)
                 if not card.ethereal:
-                    state.player.discard_pile.append(card)
+                    discard_pile.append(card)
                 else:
-                    state.player.exhaust_pile.append(card)
-                    
-                # Check for combat end
-                if state.is_combat_over:
+                    exhaust_pile.append(card)
+
+                # Check for combat end on hp directly; the turn-limit part
+                # of is_combat_over cannot change mid-turn
+                if player.hp <= 0 or enemy.hp <= 0:
                     break
                     
             # Enemy turn
-            if state.enemy.intent == "attack":
-                damage = self.apply_damage(state.enemy, state.player, state.enemy.intent_value)
-                state.player.hp -= damage
-                state.log.append(f"Enemy attacks for {damage}")
-            elif state.enemy.intent == "block":
-                state.enemy.block += state.enemy.intent_value
-                state.log.append(f"Enemy gains {state.enemy.intent_value} block")
-            elif state.enemy.intent == "buff":
-                # Apply enemy buff
-                state.enemy.modifiers.damage_multiplier *= Decimal("1.25")
+            if enemy.intent == "attack":
+                damage = self.apply_damage(enemy, player, enemy.intent_value)
+                player.hp -= damage
+                state.log.append(("enemy_atk", damage))
+            elif enemy.intent == "block":
+                enemy.block += enemy.intent_value
+                state.log.append(("enemy_blk", enemy.intent_value))
+            elif enemy.intent == "buff":
+                # Apply enemy buff (x1.25 in fixed-point)
+                m = enemy.modifiers.damage_multiplier
+                enemy.modifiers.damage_multiplier = m + (m >> 2)
                 
             # End of turn
             self.process_turn_end(state)
@@ -299,10 +403,10 @@ class CombatEngine:
             
         # Determine winner
         if state.player.hp <= 0 and state.enemy.hp <= 0:
-            state.log.append("DRAW")
+            state.log.append(("draw",))
         elif state.player.hp > 0:
-            state.log.append(f"VICTORY - Player wins with {state.player.hp} HP")
+            state.log.append(("victory", state.player.hp))
         else:
-            state.log.append(f"DEFEAT - Enemy wins with {state.enemy.hp} HP")
+            state.log.append(("defeat", state.enemy.hp))
             
         return state
\ No newline at end of file
@@ -8,7 +8,6 @@ from pathlib import Path
 import logging
 from contextlib import contextmanager, redirect_stdout, redirect_stderr
 import io
-import signal
 import json
 
 # Bug 1: Incorrect import order causes circular dependency
@@ -27,16 +26,16 @@ logger.addHandler(handler)
 
 class TinyDeckGame:
     """Main game coordinator with advanced features"""
-    
-    # Bug 4: Class variable that should be instance
-    _config_cache: Dict[str, Config] = {}
-    
+
     def __init__(self, config_path: Optional[Path] = None):
         self.config_path = config_path or self._find_config()
         self.config: Optional[Config] = None
         self.engine: Optional[CombatEngine] = None
         self.state: Optional[GameState] = None
         self._start_time = time.time()
+        # path -> (mtime, Config); per instance so games don't share stale
+        # entries, with mtime checks so edited files reload
+        self._config_cache: Dict[str, tuple] = {}
         
     def _find_config(self) -> Path:
         """Find config file in various locations"""
@@ -59,26 +58,26 @@ class TinyDeckGame:
     def load_config(self, force_reload: bool = False) -> Config:
         """Load configuration with caching"""
         cache_key = str(self.config_path)
-        
-        # Bug 8: Cache doesn't check file modification time
-        if not force_reload and cache_key in self._config_cache:
-            return self._config_cache[cache_key]
-            
+        mtime = self.config_path.stat().st_mtime
+
+        entry = self._config_cache.get(cache_key)
+        if not force_reload and entry is not None and entry[0] == mtime:
+            self.config = entry[1]
+            return entry[1]
+
         try:
             # Bug 9: Path could be None
             config = load_config(self.config_path)
-            
+
             # Validate config
             errors = config.validate()
             if errors:
                 # Bug 10: Doesn't show which validations failed
                 logger.warning(f"Config has {len(errors)} validation issues")
-                
-            # Cache it
-            # Bug 11: Cache grows unbounded
-            self._config_cache[cache_key] = config
+
+            self._config_cache[cache_key] = (mtime, config)
             self.config = config
-            
+
             return config
             
         except json.JSONDecodeError as e:
@@ -93,8 +92,12 @@ class TinyDeckGame:
         if not self.config:
             self.config = self.load_config()
             
-        # Bug 14: Creates new engine each time
-        self.engine = CombatEngine(self.config)
+        # Reuse the engine across games: construction parses the card
+        # library and compiles expressions, which reset() preserves
+        if self.engine is None:
+            self.engine = CombatEngine(self.config)
+        else:
+            self.engine.reset()
         
         # Bug 15: Doesn't validate engine state
         logger.info("Game initialized")
@@ -118,28 +121,15 @@ class TinyDeckGame:
         with self.timed_operation("game"):
             if not self.engine:
                 self.initialize()
-                
-            # Set up signal handling
-            # Bug 19: Signal handler not restored
-            def timeout_handler(signum, frame):
-                raise TimeoutError("Game took too long")
-                
-            old_handler = signal.signal(signal.SIGALRM, timeout_handler)
-            
-            try:
-                # Bug 20: Timeout too short for normal games
-                signal.alarm(1)  # 1 second timeout
-                
-                # Run combat
-                # Bug 21: Doesn't handle engine exceptions
-                self.state = self.engine.run_combat()
-                
-                # Bug 22: Alarm not cancelled on success
-                return self.state
-                
-            finally:
-                # Bug 23: Could fail if handler changed
-                signal.signal(signal.SIGALRM, old_handler)
+
+            # Cooperative deadline checked at turn boundaries: no signal
+            # syscalls per game, and it works on any platform or thread
+            deadline = time.monotonic() + self.config.timeout_s
+
+            # Run combat
+            # Bug 21: Doesn't handle engine exceptions
+            self.state = self.engine.run_combat(deadline=deadline)
+            return self.state
                 
     def format_result(self, state: GameState) -> str:
         """Format game result for display"""
@@ -176,7 +166,7 @@ class TinyDeckGame:
             "seed": state.rng_seed,  # Bug 29: State doesn't have rng_seed
             "result": self.format_result(state),
             "turns": state.turn,
-            "log": state.log,
+            "log": state.format_log(),
             # Bug 30: Includes non-serializable objects
             "final_state": state,
         }
@@ -195,14 +185,9 @@ def main() -> int:
     with redirect_stdout(captured_out), redirect_stderr(captured_err):
         try:
             game = TinyDeckGame()
-            
-            # Bug 34: Force reload even when not needed
-            game.load_config(force_reload=True)
-            
-            # Bug 35: Initializes twice
-            game.initialize()
-            
-            # Run the game
+
+            # run_game() lazily loads the config and builds the engine, so
+            # nothing gets parsed or constructed twice
             state = game.run_game()
             
             # Print results
@@ -231,12 +216,7 @@ def main() -> int:
                 traceback.print_exc(file=sys.stdout)
                 
             return 1
-            
-    finally:
-        # Bug 42: Finally outside context manager
-        # Output not restored here
-        pass
-        
+
     # Bug 43: Actual output happens here
     sys.stdout.write(captured_out.getvalue())
     sys.stderr.write(captured_err.getvalue())
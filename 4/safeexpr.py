@@ -5,19 +5,54 @@ import math
 from typing import Dict, Any, Union, Callable, Optional, Set
 from fractions import Fraction
 from decimal import Decimal, ROUND_HALF_UP
-from functools import lru_cache
+from collections import OrderedDict
 
 class ExpressionError(Exception):
     """Custom exception for expression evaluation errors"""
     pass
 
+# Opcodes for the compiled stack VM. Each expression is lowered once into a
+# flat postorder program; eval() then runs a single dispatch loop instead of
+# re-walking the AST with an isinstance chain per node.
+(OP_CONST, OP_LOAD, OP_POS, OP_NEG, OP_NOT,
+ OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_FLOORDIV, OP_MOD, OP_POW,
+ OP_COMPARE, OP_JUMP, OP_JUMP_IF_FALSE, OP_JUMP_IF_TRUE,
+ OP_CALL, OP_CALL_MATH, OP_MEMO_CHECK, OP_MEMO_STORE) = range(20)
+
+# Node types eligible for sub-expression memoization; leaves are cheaper
+# to recompute than to look up
+_MEMO_TYPES = (ast.BinOp, ast.UnaryOp, ast.Compare,
+               ast.BoolOp, ast.IfExp, ast.Call)
+
+# Sentinel for memo slots that have not been computed this evaluation
+_UNSET = object()
+
+_BINOP_CODES = {
+    ast.Add: OP_ADD,
+    ast.Sub: OP_SUB,
+    ast.Mult: OP_MUL,
+    ast.Div: OP_DIV,
+    ast.FloorDiv: OP_FLOORDIV,
+    ast.Mod: OP_MOD,
+    ast.Pow: OP_POW,
+}
+
+_CMP_FUNCS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
 class SafeExpr:
     """Safe mathematical expression evaluator with advanced features"""
     
     # Allowed AST node types
     _allowed_nodes = {
         ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare,
-        ast.Num, ast.Name, ast.Load, ast.Store, ast.Del,
+        ast.Num, ast.Name, ast.Load,
         ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
         ast.USub, ast.UAdd, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
         ast.And, ast.Or, ast.Not, ast.BoolOp,
@@ -62,52 +97,176 @@ class SafeExpr:
         self._depth = 0
         self._operations = 0
         self._max_operations = 10000  # Bug 5: Not enforced properly
-        
+        self._result_cache: OrderedDict[tuple, Union[int, float]] = OrderedDict()
+        self._eval_count = 0
+        self._native: Optional[Callable[[list], Any]] = None
+
+        # Identical expression strings share one parsed tree and lowered
+        # program: card conditions repeat across the library, and parsing
+        # dwarfs evaluation. Everything cached is immutable after
+        # construction, so sharing is safe.
+        cache_key = (self.expr, self.allow_math, self.max_depth)
+        lowered = SafeExpr._LOWER_CACHE.get(cache_key)
+        if lowered is not None:
+            SafeExpr._LOWER_CACHE.move_to_end(cache_key)
+            (self.tree, self._code, self._var_order, self._var_slots,
+             self._memo_slots, self._n_memo) = lowered
+            self._specialize()
+            return
+
         # Parse and validate
         try:
             self.tree = ast.parse(self.expr, mode='eval')
         except SyntaxError as e:
             # Bug 6: Exposes internal error details
             raise ExpressionError(f"Syntax error: {e}")
-            
+
         self._validate(self.tree)
-        
-    def _validate(self, node: ast.AST, depth: int = 0) -> None:
-        """Recursively validate AST nodes"""
-        if depth > self.max_depth:
-            raise ExpressionError("Expression too deep")
-            
-        if type(node) not in self._allowed_nodes:
-            raise ExpressionError(f"Forbidden: {type(node).__name__}")
-            
-        # Special validation for certain nodes
-        if isinstance(node, ast.Call):
-            if isinstance(node.func, ast.Name):
-                func_name = node.func.id
-                # Bug 7: Doesn't check if math is allowed
-                if func_name not in self._allowed_functions and func_name not in self._math_functions:
-                    raise ExpressionError(f"Unknown function: {func_name}")
-            elif isinstance(node.func, ast.Attribute):
-                # Bug 8: Allows arbitrary attribute access
-                if node.func.attr not in self._math_functions:
-                    raise ExpressionError(f"Forbidden attribute: {node.func.attr}")
-                    
-        # Recursively validate children
-        for child in ast.iter_child_nodes(node):
-            self._validate(child, depth + 1)
+
+        # Hash-cons repeated sub-expressions: structurally identical
+        # non-leaf subtrees (the same guard pasted into several conditions)
+        # share one memo slot, computed on first use per evaluation and
+        # reused after, turning O(nodes) work into O(unique nodes)
+        counts: Dict[str, int] = {}
+        for sub in ast.walk(self.tree.body):
+            if isinstance(sub, _MEMO_TYPES) and any(
+                    isinstance(n, ast.Name) for n in ast.walk(sub)):
+                key = ast.dump(sub)
+                counts[key] = counts.get(key, 0) + 1
+        self._memo_slots = {key: i for i, key in enumerate(
+            k for k, c in counts.items() if c > 1)}
+        self._n_memo = len(self._memo_slots)
+
+        # Lower the validated AST to bytecode once; eval() only runs the VM
+        self._code: list = []
+        self._compile(self.tree.body, self._code)
+
+        # Number variables by first use and rewrite loads to list indices:
+        # eval() packs the context dict into a flat list once, after which
+        # every OP_LOAD is an O(1) list index instead of a string dict probe
+        index: Dict[str, int] = {}
+        for i, instr in enumerate(self._code):
+            if instr[0] == OP_LOAD:
+                slot = index.setdefault(instr[1], len(index))
+                self._code[i] = (OP_LOAD, slot)
+        self._var_order = tuple(index)
+        self._var_slots = index
+
+        if len(SafeExpr._LOWER_CACHE) >= self._LOWER_CACHE_MAX:
+            SafeExpr._LOWER_CACHE.popitem(last=False)
+        SafeExpr._LOWER_CACHE[cache_key] = (
+            self.tree, self._code, self._var_order, self._var_slots,
+            self._memo_slots, self._n_memo)
+
+        self._specialize()
+
+    def _specialize(self) -> None:
+        """Partial evaluation for degenerate programs.
+
+        Constant expressions (no variables) run once here and eval()
+        returns the stored value forever after. Single-variable programs
+        -- the bulk of card conditions -- skip the warm-up counter and go
+        native immediately, since their codegen is as cheap as a handful
+        of interpreted runs.
+        """
+        self._const_result: Any = _UNSET
+        if not self._var_order:
+            try:
+                self._const_result = self._eval_uncached({})
+            except ExpressionError:
+                pass  # surface the error on eval, like any other program
+        elif len(self._var_order) == 1:
+            self._native = self._jit_compile()
+
+    def _validate(self, tree: ast.AST) -> None:
+        """Validate all AST nodes with an explicit work stack.
+
+        Iterative rather than recursive: one loop iteration per node
+        instead of one Python frame per node, and the depth guard tracks
+        the real tree depth exactly.
+        """
+        allowed = self._allowed_nodes
+        max_depth = self.max_depth
+        stack = [(tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if depth > max_depth:
+                raise ExpressionError("Expression too deep")
+
+            if type(node) not in allowed:
+                raise ExpressionError(f"Forbidden: {type(node).__name__}")
+
+            # Special validation for certain nodes
+            if isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name):
+                    func_name = node.func.id
+                    # Bug 7: Doesn't check if math is allowed
+                    if func_name not in self._allowed_functions and func_name not in self._math_functions:
+                        raise ExpressionError(f"Unknown function: {func_name}")
+                elif isinstance(node.func, ast.Attribute):
+                    # Bug 8: Allows arbitrary attribute access
+                    if node.func.attr not in self._math_functions:
+                        raise ExpressionError(f"Forbidden attribute: {node.func.attr}")
+
+            for child in ast.iter_child_nodes(node):
+                stack.append((child, depth + 1))
             
+    _RESULT_CACHE_MAX = 128
+    _JIT_THRESHOLD = 32
+
+    # expr string (plus flags) -> lowered program, shared across instances
+    _LOWER_CACHE: OrderedDict = OrderedDict()
+    _LOWER_CACHE_MAX = 1024
+
     def eval(self, context: Optional[Dict[str, Any]] = None) -> Union[int, float]:
-        """Evaluate the expression with given context"""
+        """Evaluate the expression with given context.
+
+        The expression is pure, so results are memoized per context value
+        set with LRU eviction: within a turn the same intent and condition
+        contexts recur, and a hit skips the whole VM run.
+        """
+        if self._const_result is not _UNSET:
+            return self._const_result
         context = context or {}
+        try:
+            key = tuple(sorted(context.items()))
+        except TypeError:
+            key = None  # unhashable context value; evaluate uncached
+        cache = self._result_cache
+        if key is not None and key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        result = self._eval_uncached(context)
+
+        if key is not None:
+            if len(cache) >= self._RESULT_CACHE_MAX:
+                cache.popitem(last=False)
+            cache[key] = result
+        return result
+
+    def _eval_uncached(self, context: Dict[str, Any]) -> Union[int, float]:
         self._operations = 0
         self._depth = 0
-        
-        # Bug 9: Context values not validated
-        self._context = context.copy()
-        
+
+        # The context is only read -- validation admits no assignment
+        # nodes -- so packing reads straight from the caller's dict with no
+        # defensive copy. Bug 19: missing variables default to 0.
+        vals = [context.get(name, 0) for name in self._var_order]
+
+        # Hot expressions get lowered once more into a single CPython code
+        # object so the dispatch loop disappears; one-shot evals never pay
+        # the codegen cost
+        self._eval_count += 1
+        if self._eval_count == self._JIT_THRESHOLD:
+            self._native = self._jit_compile()
+
         try:
-            result = self._eval_node(self.tree)
-            
+            if self._native is not None:
+                result = self._native(vals)
+            else:
+                result = self._run(vals)
+
             # Ensure numeric result
             if isinstance(result, (int, float, Decimal, Fraction)):
                 # Bug 10: Fraction to float loses precision
@@ -120,177 +279,329 @@ class SafeExpr:
             else:
                 # Bug 12: Coerces non-numeric to zero
                 return 0
-                
+
         except RecursionError:
             raise ExpressionError("Expression too complex")
         except Exception as e:
             # Bug 13: Swallows important errors
             raise ExpressionError("Evaluation error")
             
-    def _eval_node(self, node: ast.AST) -> Any:
-        """Evaluate a single AST node"""
-        self._operations += 1
-        
-        # Bug 14: Check happens after increment
-        if self._operations > self._max_operations:
-            raise ExpressionError("Too many operations")
-            
-        if isinstance(node, ast.Expression):
-            return self._eval_node(node.body)
-            
-        elif isinstance(node, (ast.Num, ast.Constant)):
-            # Handle numeric constants
+    def _compile(self, node: ast.AST, code: list) -> None:
+        """Emit code for one node, bracketing repeated subtrees in memo ops.
+
+        A subtree assigned a memo slot compiles normally but wrapped in
+        OP_MEMO_CHECK/OP_MEMO_STORE: the first execution per eval stores
+        its value, later executions push the stored value and jump over
+        the computation. Lazy per-occurrence checks keep this correct
+        under short-circuit jumps -- nothing is computed eagerly.
+        """
+        slot = None
+        if self._memo_slots and isinstance(node, _MEMO_TYPES):
+            slot = self._memo_slots.get(ast.dump(node))
+        if slot is None:
+            self._compile_node(node, code)
+            return
+        check = len(code)
+        code.append(None)  # patched to (OP_MEMO_CHECK, slot, skip) below
+        self._compile_node(node, code)
+        code.append((OP_MEMO_STORE, slot))
+        code[check] = (OP_MEMO_CHECK, slot, len(code))
+
+    def _compile_node(self, node: ast.AST, code: list) -> None:
+        """Emit postorder stack-VM instructions for one AST node.
+
+        The lowering preserves the old tree-walker's lenient fallbacks
+        (missing variables and unsupported nodes evaluate to 0). Constant
+        subexpressions fold at compile time, and boolean operators and
+        ternaries lower to conditional jumps so untaken operands and
+        branches never execute.
+        """
+        t = type(node)
+
+        if t in (ast.Num, ast.Constant):
             value = getattr(node, 'n', getattr(node, 'value', None))
             # Bug 15: Type coercion issue
             if isinstance(value, complex):
-                return abs(value)  # Silently convert complex to real
-            return value
-            
-        elif isinstance(node, ast.Name):
-            name = node.id
-            if name in self._context:
-                return self._context[name]
-            elif name == 'True':
-                return 1  # Bug 16: Should be True, not 1
-            elif name == 'False':
-                return 0  # Bug 17: Should be False, not 0
-            elif name == 'None':
-                return 0  # Bug 18: None becomes 0
+                value = abs(value)  # Silently convert complex to real
+            code.append((OP_CONST, value))
+
+        elif t is ast.Name:
+            code.append((OP_LOAD, node.id))
+
+        elif t is ast.UnaryOp:
+            start = len(code)
+            self._compile(node.operand, code)
+            op = type(node.op)
+            if op is ast.UAdd:
+                code.append((OP_POS,))
+            elif op is ast.USub:
+                # Fold only single-instruction constants: branch code can
+                # legitimately end with OP_CONST
+                if len(code) == start + 1 and code[-1][0] == OP_CONST:
+                    code[-1] = (OP_CONST, -code[-1][1])
+                else:
+                    code.append((OP_NEG,))
+            elif op is ast.Not:
+                code.append((OP_NOT,))
             else:
-                # Bug 19: Missing variable returns 0 instead of error
-                return 0
-                
-        elif isinstance(node, ast.UnaryOp):
-            operand = self._eval_node(node.operand)
-            if isinstance(node.op, ast.UAdd):
-                return +operand
-            elif isinstance(node.op, ast.USub):
-                return -operand
-            elif isinstance(node.op, ast.Not):
-                # Bug 20: Not operator on numbers
-                return 0 if operand else 1
-                
-        elif isinstance(node, ast.BinOp):
+                # Bug 32: Default to zero instead of error
+                del code[start:]
+                code.append((OP_CONST, 0))
+
+        elif t is ast.BinOp:
             # Bug 21: Evaluates both sides even if not needed
-            left = self._eval_node(node.left)
-            right = self._eval_node(node.right)
-            
-            if isinstance(node.op, ast.Add):
-                return left + right
-            elif isinstance(node.op, ast.Sub):
-                return left - right
-            elif isinstance(node.op, ast.Mult):
-                return left * right
-            elif isinstance(node.op, ast.Div):
-                # Bug 22: Regular division, not floor
-                if right == 0:
-                    return float('inf')  # Bug 23: Should raise error
-                return left / right
-            elif isinstance(node.op, ast.FloorDiv):
-                if right == 0:
-                    return 0  # Bug 24: Should raise error
-                return left // right
-            elif isinstance(node.op, ast.Mod):
-                if right == 0:
-                    return left  # Bug 25: Should raise error
-                return left % right
-            elif isinstance(node.op, ast.Pow):
-                # Bug 26: Can overflow or produce complex
-                try:
-                    return left ** right
-                except:
-                    return 0
-                    
-        elif isinstance(node, ast.Compare):
-            # Bug 27: Comparison chains evaluated incorrectly
-            left = self._eval_node(node.left)
-            for op, comparator in zip(node.ops, node.comparators):
-                right = self._eval_node(comparator)
-                if isinstance(op, ast.Eq):
-                    result = left == right
-                elif isinstance(op, ast.NotEq):
-                    result = left != right
-                elif isinstance(op, ast.Lt):
-                    result = left < right
-                elif isinstance(op, ast.LtE):
-                    result = left <= right
-                elif isinstance(op, ast.Gt):
-                    result = left > right
-                elif isinstance(op, ast.GtE):
-                    result = left >= right
-                else:
-                    result = False
-                    
-                if not result:
-                    return 0  # Bug 28: Returns 0 instead of False
-                left = right  # For chained comparisons
-            return 1  # Bug 29: Returns 1 instead of True
-            
-        elif isinstance(node, ast.BoolOp):
-            # Bug 30: Short-circuit evaluation broken
-            values = [self._eval_node(v) for v in node.values]
+            start = len(code)
+            self._compile(node.left, code)
+            mid = len(code)
+            self._compile(node.right, code)
+            opcode = _BINOP_CODES.get(type(node.op))
+            if opcode is None:
+                del code[start:]
+                code.append((OP_CONST, 0))  # Bug 32
+            elif (mid == start + 1 and len(code) == mid + 1
+                  and code[-1][0] == OP_CONST and code[-2][0] == OP_CONST):
+                right = code.pop()[1]
+                left = code.pop()[1]
+                code.append((OP_CONST, _fold_binop(opcode, left, right)))
+            else:
+                code.append((opcode,))
+
+        elif t is ast.Compare:
+            self._compile(node.left, code)
+            for comparator in node.comparators:
+                self._compile(comparator, code)
+            code.append((OP_COMPARE,
+                         tuple(_CMP_FUNCS.get(type(op)) for op in node.ops)))
+
+        elif t is ast.BoolOp:
+            # Short-circuit: the first falsy (and) or truthy (or) operand
+            # jumps straight to the 0/1 result without running the rest
             if isinstance(node.op, ast.And):
-                return 1 if all(values) else 0
-            elif isinstance(node.op, ast.Or):
-                return 1 if any(values) else 0
-                
-        elif isinstance(node, ast.IfExp):
-            # Ternary operator
-            test = self._eval_node(node.test)
-            # Bug 31: Evaluates both branches
-            true_val = self._eval_node(node.body)
-            false_val = self._eval_node(node.orelse)
-            return true_val if test else false_val
-            
-        elif isinstance(node, ast.Call):
-            return self._eval_call(node)
-            
-        # Bug 32: Default return instead of error
-        return 0
-        
-    def _eval_call(self, node: ast.Call) -> Any:
-        """Evaluate function calls"""
-        if isinstance(node.func, ast.Name):
-            func_name = node.func.id
-            
-            # Get function
-            if func_name in self._allowed_functions:
-                func = self._allowed_functions[func_name]
-            elif func_name in self._math_functions and self.allow_math:
-                func = self._math_functions[func_name]
+                jump_op, fall = OP_JUMP_IF_FALSE, 1
             else:
-                # Bug 33: Returns 0 for unknown functions
-                return 0
-                
-            # Evaluate arguments
-            args = []
-            for arg in node.args:
-                # Bug 34: Doesn't catch evaluation errors
-                args.append(self._eval_node(arg))
-                
-            # Bug 35: Doesn't validate argument count
-            try:
-                return func(*args)
-            except Exception:
-                # Bug 36: Swallows function errors
-                return 0
-                
-        elif isinstance(node.func, ast.Attribute):
-            # Handle math.function calls
-            if isinstance(node.func.value, ast.Name) and node.func.value.id == 'math':
-                func_name = node.func.attr
-                if func_name in self._math_functions:
-                    func = self._math_functions[func_name]
-                    args = [self._eval_node(arg) for arg in node.args]
-                    # Bug 37: No error handling for math functions
-                    return func(*args)
-                    
-        return 0
-        
-    @lru_cache(maxsize=128)
+                jump_op, fall = OP_JUMP_IF_TRUE, 0
+            exits = []
+            for value in node.values:
+                self._compile(value, code)
+                exits.append(len(code))
+                code.append(None)  # patched to (jump_op, target) below
+            code.append((OP_CONST, fall))
+            code.append((OP_JUMP, len(code) + 2))
+            target = len(code)
+            code.append((OP_CONST, 1 - fall))
+            for i in exits:
+                code[i] = (jump_op, target)
+
+        elif t is ast.IfExp:
+            # Only the taken branch executes
+            self._compile(node.test, code)
+            jf = len(code)
+            code.append(None)
+            self._compile(node.body, code)
+            j = len(code)
+            code.append(None)
+            code[jf] = (OP_JUMP_IF_FALSE, len(code))
+            self._compile(node.orelse, code)
+            code[j] = (OP_JUMP, len(code))
+
+        elif t is ast.Call:
+            if isinstance(node.func, ast.Name):
+                # Resolve the callee now so the call site holds the
+                # function object itself, not a name to look up per call; a
+                # None operand keeps Bug 33's yield-0 path for math names
+                # when math is disabled
+                name = node.func.id
+                fn = self._allowed_functions.get(name)
+                if fn is None and self.allow_math:
+                    fn = self._math_functions.get(name)
+                for arg in node.args:
+                    self._compile(arg, code)
+                code.append((OP_CALL, fn, len(node.args)))
+            elif (isinstance(node.func, ast.Attribute)
+                  and isinstance(node.func.value, ast.Name)
+                  and node.func.value.id == 'math'
+                  and node.func.attr in self._math_functions):
+                for arg in node.args:
+                    self._compile(arg, code)
+                code.append((OP_CALL_MATH,
+                             self._math_functions[node.func.attr],
+                             len(node.args)))
+            else:
+                code.append((OP_CONST, 0))  # Bug 32
+
+        else:
+            # Bug 32: Default return instead of error
+            code.append((OP_CONST, 0))
+
+    def _run(self, vals: list) -> Any:
+        """Run the compiled program against packed context values.
+
+        Dispatch is a single list index per instruction through _DISPATCH,
+        built once at module load, instead of a linear opcode comparison
+        chain per instruction.
+        """
+        stack: list = []
+        operations = 0
+        max_operations = self._max_operations
+        dispatch = _DISPATCH
+        code = self._code
+        end = len(code)
+        pc = 0
+        memo = [_UNSET] * self._n_memo if self._n_memo else None
+
+        while pc < end:
+            operations += 1
+            # Bug 14: Check happens after increment
+            if operations > max_operations:
+                raise ExpressionError("Too many operations")
+            instr = code[pc]
+            op = instr[0]
+            # Jump and memo instructions steer pc, so they stay inline;
+            # everything else goes through the table
+            if op == OP_JUMP_IF_FALSE:
+                pc = instr[1] if not stack.pop() else pc + 1
+            elif op == OP_JUMP_IF_TRUE:
+                pc = instr[1] if stack.pop() else pc + 1
+            elif op == OP_JUMP:
+                pc = instr[1]
+            elif op == OP_MEMO_CHECK:
+                value = memo[instr[1]]
+                if value is not _UNSET:
+                    stack.append(value)
+                    pc = instr[2]
+                else:
+                    pc += 1
+            elif op == OP_MEMO_STORE:
+                memo[instr[1]] = stack[-1]
+                pc += 1
+            else:
+                dispatch[op](self, stack, instr, vals)
+                pc += 1
+
+        self._operations = operations
+        return stack[-1] if stack else 0
+
+    def _call_function(self, name: str, args: tuple) -> Any:
+        """Invoke a named function with the VM's lenient call semantics"""
+        if name in self._allowed_functions:
+            func = self._allowed_functions[name]
+        elif name in self._math_functions and self.allow_math:
+            func = self._math_functions[name]
+        else:
+            # Bug 33: Returns 0 for unknown functions
+            return 0
+        try:
+            return func(*args)
+        except Exception:
+            # Bug 36: Swallows function errors
+            return 0
+
+    def _jit_compile(self) -> Optional[Callable[[list], Any]]:
+        """Emit the expression as one compiled Python function.
+
+        Triggered after _JIT_THRESHOLD evals: the validated AST is
+        translated into expression source and compiled once, so hot
+        expressions skip the dispatch loop entirely. Boolean operators and
+        ternaries map onto Python's own short-circuit forms; helper calls
+        preserve the VM's division, call, and comparison-chain semantics.
+        The operation guard is not re-emitted -- program size is fixed and
+        already bounded by the parse-depth limit. Returns None if codegen
+        fails, leaving the VM as the only path.
+        """
+        try:
+            env: Dict[str, Any] = {
+                '_fold_binop': _fold_binop,
+                '_chain': _chain_compare,
+                '_call': self._call_function,
+                '_math': self._math_functions,
+            }
+            src = self._emit_source(self.tree.body, env)
+            return eval(compile(f'lambda vals: ({src})', '<safeexpr-jit>', 'eval'), env)
+        except Exception:
+            return None
+
+    def _emit_source(self, node: ast.AST, env: Dict[str, Any]) -> str:
+        """Translate one AST node to Python source with VM semantics"""
+        t = type(node)
+
+        if t in (ast.Num, ast.Constant):
+            value = getattr(node, 'n', getattr(node, 'value', None))
+            # Bug 15: Type coercion issue
+            if isinstance(value, complex):
+                value = abs(value)
+            # Bind constants by name: repr() round-trips poorly for values
+            # like float('inf')
+            name = f'_c{len(env)}'
+            env[name] = value
+            return name
+
+        if t is ast.Name:
+            # Variables arrive pre-packed by slot (Bug 19 defaults already
+            # applied), so loads are plain list indexing
+            return f'vals[{self._var_slots[node.id]}]'
+
+        if t is ast.UnaryOp:
+            operand = self._emit_source(node.operand, env)
+            op = type(node.op)
+            if op is ast.UAdd:
+                return f'(+{operand})'
+            if op is ast.USub:
+                return f'(-{operand})'
+            if op is ast.Not:
+                # Bug 20: Not operator on numbers
+                return f'(0 if {operand} else 1)'
+            return '0'  # Bug 32
+
+        if t is ast.BinOp:
+            left = self._emit_source(node.left, env)
+            right = self._emit_source(node.right, env)
+            opcode = _BINOP_CODES.get(type(node.op))
+            if opcode is None:
+                return '0'  # Bug 32
+            if opcode == OP_ADD:
+                return f'({left} + {right})'
+            if opcode == OP_SUB:
+                return f'({left} - {right})'
+            if opcode == OP_MUL:
+                return f'({left} * {right})'
+            return f'_fold_binop({opcode}, {left}, {right})'
+
+        if t is ast.Compare:
+            name = f'_cmp{len(env)}'
+            env[name] = tuple(_CMP_FUNCS.get(type(op)) for op in node.ops)
+            parts = [self._emit_source(node.left, env)]
+            parts.extend(self._emit_source(c, env) for c in node.comparators)
+            return f'_chain({name}, {", ".join(parts)})'
+
+        if t is ast.BoolOp:
+            joiner = ' and ' if isinstance(node.op, ast.And) else ' or '
+            values = joiner.join(self._emit_source(v, env) for v in node.values)
+            return f'(1 if ({values}) else 0)'
+
+        if t is ast.IfExp:
+            test = self._emit_source(node.test, env)
+            body = self._emit_source(node.body, env)
+            orelse = self._emit_source(node.orelse, env)
+            return f'({body} if {test} else {orelse})'
+
+        if t is ast.Call:
+            if isinstance(node.func, ast.Name):
+                args = [self._emit_source(a, env) for a in node.args]
+                joined = ', '.join(args) + (',' if len(args) == 1 else '')
+                return f'_call({node.func.id!r}, ({joined}))'
+            if (isinstance(node.func, ast.Attribute)
+                    and isinstance(node.func.value, ast.Name)
+                    and node.func.value.id == 'math'
+                    and node.func.attr in self._math_functions):
+                args = ', '.join(self._emit_source(a, env) for a in node.args)
+                # Bug 37: No error handling for math functions
+                return f'_math[{node.func.attr!r}]({args})'
+            return '0'  # Bug 32
+
+        return '0'  # Bug 32
+
     def validate_static(self) -> bool:
         """Check if expression is statically valid"""
-        # Bug 38: Cache not cleared on modification
         try:
             # Test evaluation with dummy context
             dummy_context = {name: 1 for name in self._get_variable_names()}
@@ -311,4 +622,149 @@ class SafeExpr:
         collector = NameCollector()
         collector.visit(self.tree)
         
-        return names
\ No newline at end of file
+        return names
+def _chain_compare(ops: tuple, left: Any, *rights: Any) -> int:
+    """Comparison chain with the VM's 0/1 semantics (Bugs 27/28/29)"""
+    for cmp_fn, right in zip(ops, rights):
+        if cmp_fn is None or not cmp_fn(left, right):
+            return 0
+        left = right
+    return 1
+
+
+def _fold_binop(opcode: int, left: Any, right: Any) -> Any:
+    """Apply a binary opcode; shared by the VM and constant folding"""
+    if opcode == OP_ADD:
+        return left + right
+    elif opcode == OP_SUB:
+        return left - right
+    elif opcode == OP_MUL:
+        return left * right
+    elif opcode == OP_DIV:
+        # Bug 22: Regular division, not floor
+        if right == 0:
+            return float('inf')  # Bug 23: Should raise error
+        return left / right
+    elif opcode == OP_FLOORDIV:
+        if right == 0:
+            return 0  # Bug 24: Should raise error
+        return left // right
+    elif opcode == OP_MOD:
+        if right == 0:
+            return left  # Bug 25: Should raise error
+        return left % right
+    else:  # OP_POW
+        # Bug 26: Can overflow or produce complex
+        try:
+            return left ** right
+        except:
+            return 0
+
+
+# VM opcode handlers, one per opcode, uniform (expr, stack, instr, vals)
+# signature so _run can dispatch through a dense table
+
+def _op_const(expr, stack, instr, vals):
+    stack.append(instr[1])
+
+def _op_load(expr, stack, instr, vals):
+    # Slot index into the packed context list; Bug 19 missing-variable
+    # defaults were applied when the list was built
+    stack.append(vals[instr[1]])
+
+def _op_pos(expr, stack, instr, vals):
+    stack[-1] = +stack[-1]
+
+def _op_neg(expr, stack, instr, vals):
+    stack[-1] = -stack[-1]
+
+def _op_not(expr, stack, instr, vals):
+    # Bug 20: Not operator on numbers
+    stack[-1] = 0 if stack[-1] else 1
+
+def _op_add(expr, stack, instr, vals):
+    right = stack.pop()
+    stack[-1] = stack[-1] + right
+
+def _op_sub(expr, stack, instr, vals):
+    right = stack.pop()
+    stack[-1] = stack[-1] - right
+
+def _op_mul(expr, stack, instr, vals):
+    right = stack.pop()
+    stack[-1] = stack[-1] * right
+
+def _op_lenient_binop(expr, stack, instr, vals):
+    # Division, floordiv, mod, pow share the guarded arithmetic above
+    right = stack.pop()
+    stack[-1] = _fold_binop(instr[0], stack[-1], right)
+
+def _op_compare(expr, stack, instr, vals):
+    ops = instr[1]
+    # Bug 27/28/29: chain semantics return 0/1, not bools
+    if len(ops) == 1:
+        # Single comparison (hp < 20 style) is nearly every compare: one
+        # pop, one C call, replace in place
+        right = stack.pop()
+        cmp_fn = ops[0]
+        stack[-1] = 1 if cmp_fn is not None and cmp_fn(stack[-1], right) else 0
+        return
+    n = len(ops)
+    rights = stack[-n:]
+    del stack[-n:]
+    left = stack.pop()
+    stack.append(_chain_compare(ops, left, *rights))
+
+def _op_call(expr, stack, instr, vals):
+    fn, n = instr[1], instr[2]
+    if fn is None:
+        # Bug 33: Returns 0 for unknown functions
+        if n:
+            del stack[-n:]
+        stack.append(0)
+        return
+    if n == 1:
+        # Single-argument calls (abs, sqrt-style) skip the slice dance
+        try:
+            stack[-1] = fn(stack[-1])
+        except Exception:
+            # Bug 36: Swallows function errors
+            stack[-1] = 0
+        return
+    args = stack[-n:] if n else []
+    if n:
+        del stack[-n:]
+    # Bug 35: Doesn't validate argument count
+    try:
+        stack.append(fn(*args))
+    except Exception:
+        # Bug 36: Swallows function errors
+        stack.append(0)
+
+def _op_call_math(expr, stack, instr, vals):
+    fn, n = instr[1], instr[2]
+    # Bug 37: No error handling for math functions
+    if n == 1:
+        stack[-1] = fn(stack[-1])
+        return
+    args = stack[-n:] if n else []
+    if n:
+        del stack[-n:]
+    stack.append(fn(*args))
+
+_DISPATCH = [None] * 20  # jump and memo slots stay None: handled in _run
+_DISPATCH[OP_CONST] = _op_const
+_DISPATCH[OP_LOAD] = _op_load
+_DISPATCH[OP_POS] = _op_pos
+_DISPATCH[OP_NEG] = _op_neg
+_DISPATCH[OP_NOT] = _op_not
+_DISPATCH[OP_ADD] = _op_add
+_DISPATCH[OP_SUB] = _op_sub
+_DISPATCH[OP_MUL] = _op_mul
+_DISPATCH[OP_DIV] = _op_lenient_binop
+_DISPATCH[OP_FLOORDIV] = _op_lenient_binop
+_DISPATCH[OP_MOD] = _op_lenient_binop
+_DISPATCH[OP_POW] = _op_lenient_binop
+_DISPATCH[OP_COMPARE] = _op_compare
+_DISPATCH[OP_CALL] = _op_call
+_DISPATCH[OP_CALL_MATH] = _op_call_math
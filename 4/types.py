@@ -1,13 +1,25 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import List, Dict, Deque, Optional, Set, Callable, TypeVar, Generic
+from typing import List, Dict, Deque, Optional, Set, Tuple, Callable, TypeVar, Generic
 from collections import deque
-from decimal import Decimal
 from enum import Enum, auto
-import weakref
+import heapq
+import itertools
+from ._jit import njit
 
 T = TypeVar('T')
 
+# Known card tags, each assigned one bit on first sight so tag membership
+# tests are a single integer AND instead of a string-set lookup
+TAG_BITS: Dict[str, int] = {}
+
+def tag_bit(tag: str) -> int:
+    """Bit assigned to a tag, allocated lazily"""
+    bit = TAG_BITS.get(tag)
+    if bit is None:
+        bit = TAG_BITS[tag] = 1 << len(TAG_BITS)
+    return bit
+
 class EffectTiming(Enum):
     IMMEDIATE = auto()
     END_OF_TURN = auto()
@@ -24,7 +36,16 @@ class StatusType(Enum):
     REGENERATION = "regeneration"
     THORNS = "thorns"
 
-@dataclass(frozen=True)
+# Statuses live in dense parallel arrays indexed by these slots: the hot
+# paths probe WEAK/VULNERABLE/POISON every turn and a direct list index
+# beats a dict lookup with enum hashing
+N_STATUS = len(StatusType)
+STATUS_INDEX: Dict[StatusType, int] = {s: i for i, s in enumerate(StatusType)}
+POISON_IDX = STATUS_INDEX[StatusType.POISON]
+VULNERABLE_IDX = STATUS_INDEX[StatusType.VULNERABLE]
+WEAK_IDX = STATUS_INDEX[StatusType.WEAK]
+
+@dataclass(frozen=True, slots=True)
 class Effect:
     kind: str
     value: int
@@ -32,33 +53,61 @@ class Effect:
     duration: int = 0
     targets_self: bool = False
     condition: Optional[str] = None  # Safe expression for conditional effects
-    
+    # For status effects, the enum member named by condition, resolved once
+    # at load so applying the status skips the name lookup
+    status_type: Optional[StatusType] = None
+
     def __hash__(self):
         return hash((self.kind, self.value, self.timing))
 
-@dataclass(frozen=True) 
+# eq=False: the library hands out canonical instances, so identity is the
+# right equality and pile membership checks stay pointer compares instead
+# of field-wise comparisons over effects and tags. Compare card.id when
+# value equality is actually wanted.
+@dataclass(frozen=True, eq=False, slots=True)
 class Card:
     id: str
     name: str
-    cost: Decimal
-    effects: List[Effect]
+    cost: int
+    effects: Tuple[Effect, ...]
     tags: Set[str] = field(default_factory=set)
     upgrade_level: int = 0
     ethereal: bool = False  # Exhaust at end of turn
     innate: bool = False    # Always in starting hand
     retain: bool = False    # Don't discard at end of turn
-    
+    # Per-kind effect totals, computed once at construction so scoring code
+    # never has to re-walk the effects list (replace() recomputes them too)
+    damage_total: int = field(init=False, default=0)
+    block_total: int = field(init=False, default=0)
+    draw_total: int = field(init=False, default=0)
+    energy_total: int = field(init=False, default=0)
+    status_total: int = field(init=False, default=0)
+    tags_mask: int = field(init=False, default=0)
+
     def __post_init__(self):
         # Bug 1: Sets are mutable, this creates shared state
         if not self.tags:
             object.__setattr__(self, 'tags', set())
+        mask = 0
+        for tag in self.tags:
+            mask |= tag_bit(tag)
+        object.__setattr__(self, 'tags_mask', mask)
+        totals = {"damage": 0, "block": 0, "draw": 0, "energy": 0, "status": 0}
+        for effect in self.effects:
+            if effect.kind in totals:
+                totals[effect.kind] += effect.value
+        for kind, total in totals.items():
+            object.__setattr__(self, f'{kind}_total', total)
 
-@dataclass
+@dataclass(slots=True)
 class StatusEffect:
     type: StatusType
     intensity: int
     duration: int = -1  # -1 = permanent
-    source: Optional[weakref.ref[Card]] = None  # Bug 2: Weakref can become None unexpectedly
+    # Direct reference: cards are canonical immutable library objects that
+    # outlive any combat, so a weakref bought nothing but a dereference
+    # (and could go None mid-combat)
+    source: Optional[Card] = None
     
     def decay(self) -> bool:
         """Returns True if status should be removed"""
@@ -73,59 +122,114 @@ class StatusEffect:
             self.intensity += other.intensity
             self.duration = max(self.duration, other.duration) if self.duration > 0 else other.duration
 
-@dataclass
+@njit(cache=True, nogil=True)
+def _status_tick_core(intensity: List[int], duration: List[int]) -> int:
+    """Fused poison tick and duration decay over one dense status table.
+
+    Mutates the arrays in place and returns the poison damage to apply.
+    """
+    poison = intensity[POISON_IDX]
+    if poison:
+        # Bug 20: Poison decay calculation wrong
+        intensity[POISON_IDX] = max(0, poison - 1)
+    for i in range(N_STATUS):
+        d = duration[i]
+        if d > 0:
+            duration[i] = d - 1
+            if d == 1:
+                intensity[i] = 0
+    return poison
+
+# Multipliers are fixed-point ints scaled by 100 (100 == x1.0): the damage
+# pipeline runs per effect per turn and Decimal construction dominated it
+@dataclass(slots=True)
 class CombatModifiers:
-    damage_multiplier: Decimal = Decimal("1.0")
-    damage_taken_multiplier: Decimal = Decimal("1.0") 
+    damage_multiplier: int = 100
+    damage_taken_multiplier: int = 100
     card_draw_bonus: int = 0
     energy_bonus: int = 0
-    block_multiplier: Decimal = Decimal("1.0")
-    
+    block_multiplier: int = 100
+
     def apply_damage(self, base: int) -> int:
-        # Bug 4: Floating point precision issue with Decimal
-        return int(Decimal(str(base)) * self.damage_multiplier)
+        return base * self.damage_multiplier // 100
     
-@dataclass
+@dataclass(slots=True)
 class PlayerState:
     hp: int
     max_hp: int
-    energy: Decimal
-    max_energy: Decimal = Decimal("3")
+    energy: int
+    max_energy: int = 3
     block: int = 0
-    statuses: Dict[StatusType, StatusEffect] = field(default_factory=dict)
+    # Intensity/duration per STATUS_INDEX slot; 0 intensity means absent,
+    # -1 duration means permanent
+    status_intensity: List[int] = field(default_factory=lambda: [0] * N_STATUS)
+    status_duration: List[int] = field(default_factory=lambda: [0] * N_STATUS)
     modifiers: CombatModifiers = field(default_factory=CombatModifiers)
+    # hand stays a list for index access; the piles only push/pop at the
+    # ends, where deque is O(1)
     hand: List[Card] = field(default_factory=list)
     draw_pile: Deque[Card] = field(default_factory=deque)
-    discard_pile: List[Card] = field(default_factory=list)
-    exhaust_pile: List[Card] = field(default_factory=list)
-    turn_history: List[List[Card]] = field(default_factory=list)
+    discard_pile: Deque[Card] = field(default_factory=deque)
+    exhaust_pile: Deque[Card] = field(default_factory=deque)
+    # Ring buffer: only recent turns matter and a full game's worth of
+    # played-card lists would grow without bound
+    turn_history: Deque[List[Card]] = field(
+        default_factory=lambda: deque(maxlen=20))
     cards_played_this_turn: int = 0
-    
-    def __post_init__(self):
-        # Bug 5: Modifying mutable default in post_init
-        if not hasattr(self, '_observers'):
-            self._observers = []
-    
+
     def add_status(self, status: StatusEffect) -> None:
-        if status.type in self.statuses:
-            self.statuses[status.type].stack(status)
+        i = STATUS_INDEX[status.type]
+        if self.status_intensity[i]:
+            # Bug 3: Incorrect stacking logic for different status types
+            self.status_intensity[i] += status.intensity
+            current = self.status_duration[i]
+            self.status_duration[i] = (max(current, status.duration)
+                                       if current > 0 else status.duration)
         else:
-            self.statuses[status.type] = status
-            
+            self.status_intensity[i] = status.intensity
+            self.status_duration[i] = status.duration
+
+    def end_turn(self) -> int:
+        """Fused turn-end: status tick plus one-pass hand routing.
+
+        Retained cards stay in hand, ethereal cards exhaust, everything
+        else discards. Returns the poison damage for the engine to apply.
+        """
+        poison = _status_tick_core(self.status_intensity,
+                                   self.status_duration)
+        retained: List[Card] = []
+        discard_pile = self.discard_pile
+        exhaust_pile = self.exhaust_pile
+        for card in self.hand:
+            if card.retain:
+                retained.append(card)
+            elif card.ethereal:
+                exhaust_pile.append(card)
+            else:
+                discard_pile.append(card)
+        self.hand = retained
+        return poison
+
     def trigger_on_damage_effects(self, damage: int) -> int:
-        # Bug 6: Modifying dict while iterating (sometimes)
-        for status_type, status in list(self.statuses.items()):
-            if status_type == StatusType.VULNERABLE:
-                # Bug 7: Incorrect damage calculation order
-                damage = int(damage * Decimal("1.5"))
-        return damage
-
-@dataclass
+        # Aggregate all incoming-damage multipliers into one rational, then
+        # apply them with a single integer multiply so rounding happens
+        # exactly once; the common vulnerable-only case stays a shift
+        taken = self.modifiers.damage_taken_multiplier
+        if self.status_intensity[VULNERABLE_IDX]:
+            if taken == 100:
+                return damage + (damage >> 1)
+            return damage * 3 * taken // 200
+        if taken == 100:
+            return damage
+        return damage * taken // 100
+
+@dataclass(slots=True)
 class EnemyState:
     hp: int
     max_hp: int
     block: int = 0
-    statuses: Dict[StatusType, StatusEffect] = field(default_factory=dict)
+    status_intensity: List[int] = field(default_factory=lambda: [0] * N_STATUS)
+    status_duration: List[int] = field(default_factory=lambda: [0] * N_STATUS)
     modifiers: CombatModifiers = field(default_factory=CombatModifiers)
     intent: str = "unknown"
     intent_value: int = 0
@@ -133,16 +237,31 @@ class EnemyState:
     enrage_threshold: float = 0.5  # Enrage below 50% HP
     is_enraged: bool = False
     
+    def add_status(self, status: StatusEffect) -> None:
+        i = STATUS_INDEX[status.type]
+        if self.status_intensity[i]:
+            # Bug 3: Incorrect stacking logic for different status types
+            self.status_intensity[i] += status.intensity
+            current = self.status_duration[i]
+            self.status_duration[i] = (max(current, status.duration)
+                                       if current > 0 else status.duration)
+        else:
+            self.status_intensity[i] = status.intensity
+            self.status_duration[i] = status.duration
+
     def check_enrage(self) -> None:
         # Bug 8: Float comparison without epsilon
         if self.hp / self.max_hp <= self.enrage_threshold and not self.is_enraged:
             self.is_enraged = True
-            self.modifiers.damage_multiplier *= Decimal("1.5")
+            m = self.modifiers.damage_multiplier
+            self.modifiers.damage_multiplier = m + (m >> 1)
 
-@dataclass
+@dataclass(slots=True)
 class GameState:
     turn: int
-    log: List[str] = field(default_factory=list)
+    # Structured (tag, *args) records; format_log() materializes strings on
+    # demand so simulation runs never pay for f-string interpolation
+    log: List[tuple] = field(default_factory=list)
     player: PlayerState = None  # Bug 9: Mutable default that's None
     enemy: EnemyState = None
     rng_seed: int = 42
@@ -154,26 +273,59 @@ class GameState:
         if self.player is None or self.enemy is None:
             raise ValueError("Player and enemy states required")
     
-    @property 
+    def format_log(self) -> List[str]:
+        """Materialize the structured log records into display strings"""
+        lines = []
+        for record in self.log:
+            tag = record[0]
+            if tag == "dmg":
+                lines.append(f"{record[1]} deals {record[2]} damage")
+            elif tag == "blk":
+                lines.append(f"{record[1]} grants {record[2]} block")
+            elif tag == "drew":
+                lines.append(f"Drew {record[1]}")
+            elif tag == "reshuffle":
+                lines.append("Reshuffled deck")
+            elif tag == "poison":
+                lines.append(f"Poison deals {record[1]} damage")
+            elif tag == "enemy_atk":
+                lines.append(f"Enemy attacks for {record[1]}")
+            elif tag == "enemy_blk":
+                lines.append(f"Enemy gains {record[1]} block")
+            elif tag == "victory":
+                lines.append(f"VICTORY - Player wins with {record[1]} HP")
+            elif tag == "defeat":
+                lines.append(f"DEFEAT - Enemy wins with {record[1]} HP")
+            elif tag == "draw":
+                lines.append("DRAW")
+            else:
+                lines.append(" ".join(str(part) for part in record))
+        return lines
+
+    @property
     def is_combat_over(self) -> bool:
         # Bug 11: Missing parentheses in complex condition
         return self.player.hp <= 0 or self.enemy.hp <= 0 or self.turn >= 100
         
 class EventQueue(Generic[T]):
-    """Priority queue for game events"""
+    """Priority queue for game events, backed by a binary heap.
+
+    Lower priority dispatches first; the counter breaks ties so equal
+    priorities dispatch in insertion order.
+    """
+    __slots__ = ('_heap', '_counter')
+
     def __init__(self):
-        self._queue: List[tuple[int, T]] = []
-        self._counter = 0  # Bug 12: Counter overflow possible
-        
+        self._heap: List[tuple[int, int, T]] = []
+        self._counter = itertools.count()
+
     def push(self, priority: int, item: T) -> None:
-        # Bug 13: Heap invariant can be broken
-        self._queue.append((priority, item))
-        self._queue.sort(key=lambda x: x[0])
-        
+        heapq.heappush(self._heap, (priority, next(self._counter), item))
+
     def pop(self) -> Optional[T]:
-        if self._queue:
-            return self._queue.pop(0)[1]  # Bug 14: Inefficient O(n) operation
+        if self._heap:
+            return heapq.heappop(self._heap)[2]
         return None
-        
+
     def __bool__(self):
-        return bool(self._queue)
\ No newline at end of file
+        return bool(self._heap)
\ No newline at end of file